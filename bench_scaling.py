@@ -0,0 +1,232 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import joblib
+import cycles
+import ml
+import solvepl
+from generator import generate_graph
+from graph_io import read_graph_from_file, write_graph_to_file
+
+FIELDNAMES = ['Taille', 'Densite', 'Graine', 'Etape', 'Temps', 'Memoire (Mo)']
+
+# Taille maximale (en sommets) pour laquelle chaque étape est lancée par défaut, au-delà l'étape
+# est notée -1 comme dans les autres benchmarks. Les modèles multi-flot et Martin ont O(n * m) variables.
+DEFAULT_MAX_NODES = {
+    'parse': 100000,
+    'features': 5000,
+    'predict': 5000,
+    'tree': 20000,
+    'cycles': 1000,
+    'build_flot': 100000,
+    'build_flot_multi': 200,
+    'build_martin': 100,
+    'build_cycles': 5000,
+}
+
+
+def measure(stage, func, *args, track_memory=True):
+    """
+    Exécute une étape en mesurant son temps et son pic de mémoire Python.
+
+    :param stage: Le nom de l'étape.
+    :param func: La fonction à exécuter.
+    :param args: Les arguments de la fonction.
+    :param track_memory: Mesure le pic de mémoire avec tracemalloc (ralentit l'exécution).
+    :return: Un couple (résultat de la fonction, (temps en secondes, pic de mémoire en Mo)).
+    """
+    if track_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = -1
+    if track_memory:
+        peak = (tracemalloc.get_traced_memory()[1] - memory_before) / 2 ** 20
+    print(f"  {stage} : {elapsed:.2f} s, {peak:.1f} Mo")
+    return result, (elapsed, peak)
+
+
+def compute_features(graph):
+    """
+    Calcule les caractéristiques de toutes les arêtes d'un graphe.
+
+    :param graph: Le graphe.
+    :return: La liste des arêtes et la matrice de caractéristiques.
+    """
+    global_features_dict = ml.calculate_global_graph_features(graph)
+    edges = list(graph.edges())
+    return edges, ml.edges_to_feature_matrix(graph, edges, global_features_dict)
+
+
+def bench_graph(graph, edge_models, path_to_cplex, time_limit, max_nodes, track_memory=True):
+    """
+    Mesure chaque étape de la résolution sur un graphe.
+
+    :param graph: Le graphe.
+    :param edge_models: Le modèle de classification (None pour ne pas mesurer la prédiction).
+    :param path_to_cplex: Chemin vers CPLEX (None pour ne pas lancer l'heuristique sur les cycles).
+    :param time_limit: Limite de temps de l'heuristique sur les cycles.
+    :param max_nodes: Taille maximale pour chaque étape.
+    :param track_memory: Mesure le pic de mémoire de chaque étape.
+    :return: Un dictionnaire {étape: (temps, mémoire)}, (-1, -1) pour les étapes non lancées.
+    """
+    nb_nodes = graph.number_of_nodes()
+    results = {stage: (-1, -1) for stage in max_nodes}
+
+    def enabled(stage):
+        return nb_nodes <= max_nodes[stage]
+
+    if enabled('parse'):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.txt')
+            write_graph_to_file(graph, path)
+            _, results['parse'] = measure('parse', read_graph_from_file, path, track_memory=track_memory)
+
+    probabilities = None
+    if enabled('features'):
+        (edges, features), results['features'] = measure('features', compute_features, graph,
+                                                         track_memory=track_memory)
+        if edge_models is not None and enabled('predict'):
+            probas, results['predict'] = measure('predict', edge_models.predict_proba, features,
+                                                 track_memory=track_memory)
+            probabilities = dict(zip(edges, probas[:, 1].tolist()))
+
+    if enabled('tree'):
+        # Sans prédiction, des probabilités aléatoires suffisent à mesurer la construction de l'arbre
+        if probabilities is None:
+            rng = random.Random(0)
+            probabilities = {edge: rng.random() for edge in graph.edges()}
+        _, results['tree'] = measure('tree', ml.build_minimum_degree_spanning_tree, probabilities,
+                                     track_memory=track_memory)
+
+    if path_to_cplex is not None and enabled('cycles'):
+        _, results['cycles'] = measure('cycles', cycles.solve_by_cycles, graph, time_limit, path_to_cplex,
+                                       track_memory=track_memory)
+
+    builds = [('build_flot', solvepl.build_pl_flot, True),
+              ('build_flot_multi', solvepl.build_pl_flot_multi, True),
+              ('build_martin', solvepl.build_pl_martin2, False),
+              ('build_cycles', cycles.build_destruct_cycles, False)]
+    for stage, build, directed in builds:
+        if enabled(stage):
+            model_graph = graph.to_directed() if directed else graph
+            _, results[stage] = measure(stage, build, model_graph, track_memory=track_memory)
+
+    return results
+
+
+def read_results(csv_path):
+    """
+    Lit un fichier de résultats et retourne le temps moyen par (taille, densité, étape).
+
+    :param csv_path: Le fichier de résultats.
+    :return: Un dictionnaire {(taille, densité, étape): temps moyen}, les étapes non lancées sont ignorées.
+    """
+    times = {}
+    with open(csv_path, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            if float(row['Temps']) < 0:
+                continue
+            key = (int(row['Taille']), int(row['Densite']), row['Etape'])
+            times.setdefault(key, []).append(float(row['Temps']))
+    return {key: sum(values) / len(values) for key, values in times.items()}
+
+
+def find_regressions(reference, current, tolerance=1.5, min_seconds=0.05):
+    """
+    Compare deux ensembles de résultats et retourne les étapes devenues plus lentes.
+
+    :param reference: Les temps de référence (voir read_results).
+    :param current: Les temps mesurés.
+    :param tolerance: Le rapport de temps à partir duquel une étape est considérée comme plus lente.
+    :param min_seconds: L'écart minimal en secondes, pour ignorer le bruit des étapes très courtes.
+    :return: La liste des (taille, densité, étape, temps de référence, temps mesuré).
+    """
+    regressions = []
+    for key, seconds in sorted(current.items()):
+        if key not in reference:
+            continue
+        if seconds > tolerance * reference[key] and seconds - reference[key] > min_seconds:
+            regressions.append(key + (reference[key], seconds))
+    return regressions
+
+
+def main():
+    """
+    Lance le benchmark de passage à l'échelle depuis la ligne de commande.
+    """
+    parser = argparse.ArgumentParser(description="Mesure le temps et la mémoire de chaque étape selon la taille du graphe.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000, 100000], help="Nombres de sommets.")
+    parser.add_argument('--levels', type=int, nargs='+', default=[3], help="Niveaux de densité (1 à 5).")
+    parser.add_argument('--repeat', type=int, default=1, help="Nombre de graphes par taille et niveau.")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du générateur aléatoire.")
+    parser.add_argument('--model', default='edge_models_xgboost.joblib', help="Modèle utilisé pour la prédiction.")
+    parser.add_argument('--cplex', default=None, help="Chemin vers CPLEX, l'heuristique sur les cycles n'est lancée que s'il est donné.")
+    parser.add_argument('--time-limit', type=int, default=120, help="Limite de temps de l'heuristique sur les cycles.")
+    parser.add_argument('--max-nodes', nargs='*', default=[], metavar='ETAPE=N',
+                        help="Taille maximale d'une étape (ex : build_martin=200).")
+    parser.add_argument('--no-memory', action='store_true', help="Ne mesure pas la mémoire (tracemalloc ralentit l'exécution).")
+    parser.add_argument('--output', default='bench_scaling.csv', help="Fichier de résultats, complété à chaque exécution.")
+    parser.add_argument('--reference', default=None, help="Fichier de résultats de référence pour détecter les régressions.")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Rapport de temps signalé comme régression.")
+    args = parser.parse_args()
+
+    max_nodes = dict(DEFAULT_MAX_NODES)
+    for option in args.max_nodes:
+        stage, value = option.split('=')
+        if stage not in max_nodes:
+            print(f"Étape inconnue : {stage}")
+            return 1
+        max_nodes[stage] = int(value)
+
+    edge_models = joblib.load(args.model) if os.path.isfile(args.model) else None
+    track_memory = not args.no_memory
+    if track_memory:
+        tracemalloc.start()
+
+    rows = []
+    graph_seed = args.seed
+    for nb_nodes in args.sizes:
+        for level in args.levels:
+            for _ in range(args.repeat):
+                print(f"Graphe de {nb_nodes} sommets, densité {level}, graine {graph_seed}")
+                graph = generate_graph(nb_nodes, level, graph_seed)
+                results = bench_graph(graph, edge_models, args.cplex, args.time_limit, max_nodes, track_memory)
+                for stage, (seconds, memory) in results.items():
+                    rows.append({'Taille': nb_nodes, 'Densite': level, 'Graine': graph_seed, 'Etape': stage,
+                                 'Temps': round(seconds, 3), 'Memoire (Mo)': round(memory, 1)})
+                graph_seed += 1
+
+    write_header = not os.path.isfile(args.output)
+    with open(args.output, 'a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+    print(f"Résultats ajoutés à {args.output}.")
+
+    if args.reference is not None:
+        current = {}
+        for row in rows:
+            if row['Temps'] >= 0:
+                current.setdefault((row['Taille'], row['Densite'], row['Etape']), []).append(row['Temps'])
+        current = {key: sum(values) / len(values) for key, values in current.items()}
+        regressions = find_regressions(read_results(args.reference), current, args.tolerance)
+        for nb_nodes, level, stage, reference_seconds, seconds in regressions:
+            print(f"Régression : {stage} sur {nb_nodes} sommets (densité {level}) : "
+                  f"{reference_seconds:.2f} s -> {seconds:.2f} s")
+        if regressions:
+            return 3
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import networkx as nx
+import jobqueue
+import ml
+import selection
+import solution_cache
+from generator import generate_graph, instance_name
+from graph_io import write_graph_to_file
+
+# Paramètres courts pour que la vérification tienne en quelques secondes
+SOLVE_SECONDS = 0.2
+HEARTBEAT_INTERVAL = 0.5
+POLL_INTERVAL = 0.2
+MAX_ATTEMPTS = 3
+# Le démarrage du processus d'une tâche (imports) compte dans ce délai, il est plus long avec la méthode spawn
+GRACE_PERIOD = 10
+LOST_WORKER = 'machine-perdue:0'
+FAILING_GRAPH = 'Spd_RF2_echec.txt'
+SLOW_GRAPH = 'Spd_RF2_lent.txt'
+# Nombre de sommets du graphe dont la résolution ne se termine pas
+SLOW_NODES = 7
+
+
+def fake_solve_with_cache(graph, method, time_limit, path_to_cplex, edge_models_by_method=None,
+                          cache_dir=solution_cache.DEFAULT_CACHE_DIR):
+    """
+    Remplace selection.solve_with_cache : renvoie un arbre en largeur après une courte attente, sans CPLEX.
+
+    Un graphe non connexe lève une erreur (tâche toujours en échec), un graphe de SLOW_NODES sommets ne se termine
+    pas dans sa limite de temps et la méthode multi_flot simule une réponse du cache quand celui-ci est activé.
+    """
+    time.sleep(SOLVE_SECONDS)
+    if graph.number_of_nodes() == SLOW_NODES:
+        time.sleep(3600)
+    if not nx.is_connected(graph):
+        raise nx.NetworkXError("Le graphe n'est pas connexe.")
+    solution_cache.last_cache_hit = cache_dir is not None and method == 'multi_flot'
+    tree = nx.Graph(nx.bfs_edges(graph, 1))
+    tree.add_nodes_from(graph.nodes())
+    return tree, ml.count_branch_vertices(tree)
+
+
+def run_patched_worker(db_path, output_dir, cache_dir, stale_timeout):
+    """
+    Lance un processus de la file avec la résolution remplacée.
+
+    La fonction de remplacement est transmise à run_worker plutôt que substituée à selection.solve_with_cache :
+    chaque tâche tourne dans son propre processus, qui ne verrait pas la substitution avec la méthode spawn (Windows).
+    """
+    jobqueue.run_worker(db_path, output_dir, None, cache_dir, heartbeat_interval=HEARTBEAT_INTERVAL,
+                        stale_timeout=stale_timeout, max_attempts=MAX_ATTEMPTS, poll_interval=POLL_INTERVAL,
+                        grace_period=GRACE_PERIOD, solve=fake_solve_with_cache)
+
+
+def check_queue(directory, nb_workers=4, nb_graphs=12, stale_timeout=2):
+    """
+    Vide une file de tâches avec plusieurs processus locaux et vérifie son état final.
+
+    La file contient une tâche réservée par un processus arrêté brutalement (plus de signal de vie), une tâche
+    qui échoue à chaque essai et une tâche qui dépasse sa limite de temps.
+
+    :param directory: Le dossier de travail (base, graphes, arbres résolus, résultats).
+    :param nb_workers: Le nombre de processus.
+    :param nb_graphs: Le nombre de graphes générés.
+    :param stale_timeout: Le délai sans signal de vie après lequel une tâche est reprise.
+    :return: La liste des erreurs constatées, vide si la file s'est comportée comme prévu.
+    """
+    graph_dir = os.path.join(directory, 'graphs')
+    output_dir = os.path.join(directory, 'solved')
+    db_path = os.path.join(directory, 'queue.db')
+    os.makedirs(graph_dir)
+
+    graph_paths = []
+    for index in range(nb_graphs):
+        graph = generate_graph(30, seed=index)
+        graph_paths.append(os.path.join(graph_dir, instance_name(graph, index)))
+        write_graph_to_file(graph, graph_paths[-1])
+    failing_graph = nx.disjoint_union(nx.path_graph(3), nx.path_graph(3))
+    graph_paths.append(os.path.join(graph_dir, FAILING_GRAPH))
+    write_graph_to_file(nx.relabel_nodes(failing_graph, lambda node: node + 1), graph_paths[-1])
+
+    methods = ['flot', 'multi_flot']
+    jobqueue.add_jobs(db_path, graph_paths, methods, 5)
+
+    slow_path = os.path.join(graph_dir, SLOW_GRAPH)
+    write_graph_to_file(nx.relabel_nodes(nx.cycle_graph(SLOW_NODES), lambda node: node + 1), slow_path)
+    jobqueue.add_jobs(db_path, [slow_path], ['flot'], 1)
+
+    # Tâche réservée par un processus disparu : elle doit être reprise par un autre
+    connection = jobqueue.connect(db_path)
+    lost_job = jobqueue.claim_job(connection, LOST_WORKER)
+    connection.close()
+
+    processes = [multiprocessing.Process(target=run_patched_worker,
+                                         args=(db_path, output_dir, os.path.join(directory, 'cache'), stale_timeout))
+                 for _ in range(nb_workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    errors = []
+    connection = jobqueue.connect(db_path)
+    rows = connection.execute('SELECT id, graph, method, status, worker, attempts, cached, score, seconds '
+                              'FROM jobs').fetchall()
+    connection.close()
+
+    workers = set()
+    for job_id, graph_path, method, status, worker, attempts, cached, score, seconds in rows:
+        name = os.path.basename(graph_path)
+        if name == FAILING_GRAPH:
+            if status != jobqueue.FAILED or attempts != MAX_ATTEMPTS:
+                errors.append(f"{name} ({method}) : {status} après {attempts} essais, attendu failed après {MAX_ATTEMPTS}")
+            continue
+        if name == SLOW_GRAPH:
+            if status != jobqueue.DONE or score != -1 or attempts != 1 or seconds > 1 + GRACE_PERIOD + 5:
+                errors.append(f"{name} ({method}) : {status}, score {score} en {seconds} s après {attempts} essais, "
+                              f"attendu arrêt à la limite de temps")
+            continue
+        if status != jobqueue.DONE:
+            errors.append(f"{name} ({method}) : statut {status}")
+        if job_id == lost_job[0] and (worker == LOST_WORKER or attempts != 2):
+            errors.append(f"{name} ({method}) : tâche du processus disparu non reprise ({worker}, {attempts} essais)")
+        if bool(cached) != (method == 'multi_flot'):
+            errors.append(f"{name} ({method}) : réponse du cache mal enregistrée")
+        tree_written = os.path.isfile(os.path.join(output_dir, method, name))
+        if tree_written == bool(cached):
+            errors.append(f"{name} ({method}) : arbre écrit {tree_written}, réponse du cache {bool(cached)}")
+        workers.add(worker)
+    if len(workers) < min(nb_workers, 2):
+        errors.append(f"Un seul processus a exécuté les tâches : {workers}")
+
+    # Les réponses du cache et les tâches en échec sont exclues des résultats, le dépassement de limite de temps
+    # est une exécution sans arbre
+    csv_path = os.path.join(directory, 'bench_queue.csv')
+    runs_path = os.path.join(directory, 'bench_runs.csv')
+    written = jobqueue.export_results(db_path, csv_path, runs_path)
+    if written != nb_graphs + 2:
+        errors.append(f"{written} graphes exportés au lieu de {nb_graphs + 2}")
+    runs = selection.read_bench_runs([], runs_path)
+    if any(run['method'] == 'multi_flot' for run in runs):
+        errors.append("Des réponses du cache ont été exportées")
+    if any(run['graph'] == FAILING_GRAPH for run in runs):
+        errors.append("Des tâches en échec ont été exportées comme des exécutions")
+    if not any(run['graph'] == SLOW_GRAPH and run['score'] is None for run in runs):
+        errors.append("Le dépassement de limite de temps n'a pas été exporté")
+    if any(run['time'] < 0 for run in runs):
+        errors.append("Des temps négatifs ont été exportés")
+    runs = selection.read_bench_runs([csv_path], os.path.join(directory, 'absent.csv'))
+    if len(runs) != nb_graphs + 1:
+        errors.append(f"{len(runs)} résultats lus dans {csv_path} au lieu de {nb_graphs + 1}")
+
+    return errors
+
+
+def main():
+    """
+    Vérifie la file de tâches avec plusieurs processus locaux, sans CPLEX.
+    """
+    parser = argparse.ArgumentParser(description="Vérifie la file de tâches avec plusieurs processus locaux.")
+    parser.add_argument('--workers', type=int, default=4, help="Nombre de processus.")
+    parser.add_argument('--graphs', type=int, default=12, help="Nombre de graphes générés.")
+    parser.add_argument('--stale-timeout', type=float, default=2, help="Délai de reprise des tâches sans signal de vie.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        errors = check_queue(directory, args.workers, args.graphs, args.stale_timeout)
+
+    for error in errors:
+        print("Erreur :", error)
+    if errors:
+        return 1
+    print("File de tâches vérifiée : toutes les tâches sont terminées comme prévu.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,56 @@
-from solvepl import edges_containing_node
+from solvepl import edges_containing_node, solve_model
+import solvepl
 import networkx as nx
 import pulp as pl
 import time
 import copy
+import profiler
 
 
+def build_destruct_cycles(res_graph):
+    """
+       Construit le programme linéaire à base de cycles, sans le résoudre
+
+       @param res_graph: Le graphe d'origine.
+       @return: Le modèle PuLP et les variables de décision x.
+       """
+
+    model = pl.LpProblem("main_problem", pl.LpMinimize)
+
+    with profiler.section('cycles.destruct_cycles.build'):
+        # Nombre de sommet
+        nb_nodes = res_graph.number_of_nodes()
+        cycles = nx.cycle_basis(res_graph)
+        edges = res_graph.edges
+
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in edges}
+        x.update({(j, i): pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format((j, i))) for (i, j) in edges})
+        y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+
+        # Création de la fonction objective
+        model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
+
+        # Création des contraintes
+        # Contrainte (3)
+        model += pl.lpSum(x[e] for e in edges) == nb_nodes - 1
+
+        for (i, j) in edges:
+            model += x[(i, j)] == x[(j, i)]
+
+        # Contrainte (4)
+        for cycle in cycles:
+            long_cycle = len(cycle)
+            model += pl.lpSum(x[(cycle[k], cycle[(k + 1) % long_cycle])] for k in range(long_cycle)) <= long_cycle - 1
+
+        # Contrainte (5)
+        for v in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in edges_containing_node(res_graph, v)) - 2 <= res_graph.degree[v] * y[v]
+
+    return model, x
+
+
+@profiler.profiled()
 def destruct_cycles(graph, time_limit, path_to_cplex):
     """
        Résout le programme linéaire à base de cycles
@@ -17,42 +63,13 @@ def destruct_cycles(graph, time_limit, path_to_cplex):
 
     res_graph = copy.deepcopy(graph)
 
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
-    model = pl.LpProblem("main_problem", pl.LpMinimize)
-
-    # Nombre de sommet
-    nb_nodes = res_graph.number_of_nodes()
-    cycles = nx.cycle_basis(res_graph)
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=solvepl.LOG_PATH, msg=False)
+    model, x = build_destruct_cycles(res_graph)
     edges = res_graph.edges
 
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in edges}
-    x.update({(j, i): pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format((j, i))) for (i, j) in edges})
-    y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
-
-    # Création de la fonction objective
-    model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
-
-    # Création des contraintes
-    # Contrainte (3)
-    model += pl.lpSum(x[e] for e in edges) == nb_nodes - 1
-
-    for (i, j) in edges:
-        model += x[(i, j)] == x[(j, i)]
-
-    # Contrainte (4)
-    for cycle in cycles:
-        long_cycle = len(cycle)
-        model += pl.lpSum(x[(cycle[k], cycle[(k + 1) % long_cycle])] for k in range(long_cycle)) <= long_cycle - 1
-
-    # Contrainte (5)
-    for v in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in edges_containing_node(res_graph, v)) - 2 <= res_graph.degree[v] * y[v]
-        model.solve(solver)
-
-    model.solve(solver)
+    solve_model(model, solver, 'cycles.destruct_cycles')
 
-    model.writeLP("model.lp")
+    #model.writeLP("model.lp")
 
     for edge in edges:
         if not x[edge].value():
@@ -61,6 +78,7 @@ def destruct_cycles(graph, time_limit, path_to_cplex):
     return x, pl.value(model.objective), res_graph
 
 
+@profiler.profiled()
 def link_components(original_graph, pl_graph):
     """
        Rélie les composantes connexes du graphe
@@ -83,6 +101,7 @@ def link_components(original_graph, pl_graph):
     return res_graph
 
 
+@profiler.profiled()
 def solve_by_cycles(graph, time_limit, path_to_cplex):
     """
        Résout le problème MBVST à base de cycles
@@ -101,10 +120,13 @@ def solve_by_cycles(graph, time_limit, path_to_cplex):
     if not connected:
         connex_graph = link_components(connex_graph, pl_graph)
 
+    iterations = 1
     while not connected and (time.time() - start_time < time_limit):
+        iterations += 1
         x, z, pl_graph = destruct_cycles(connex_graph, 20, path_to_cplex)
         connected = nx.is_connected(pl_graph)
         if not connected:
             connex_graph = link_components(connex_graph, pl_graph)
 
+    profiler.record('cycles.solve_by_cycles.result', iterations=iterations, connected=connected, objective=z)
     return x, z, connex_graph
\ No newline at end of file
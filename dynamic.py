@@ -0,0 +1,273 @@
+import time
+import networkx as nx
+import numpy as np
+import ml
+import profiler
+
+
+def _normalize_edge(edge):
+    """
+    Retourne l'arête sous la forme (u, v) avec u <= v pour comparer des arêtes non orientées.
+    """
+    return (edge[0], edge[1]) if edge[0] <= edge[1] else (edge[1], edge[0])
+
+
+def _edge_probability(probabilities, edge):
+    """
+    Retourne la probabilité associée à une arête quel que soit son sens, 0.5 si elle est inconnue.
+    """
+    if edge in probabilities:
+        return probabilities[edge]
+    return probabilities.get((edge[1], edge[0]), 0.5)
+
+
+@profiler.profiled()
+def update_probabilities(graph, previous_graph, probabilities, edge_models, global_features_dict, changed_nodes,
+                         deleted_edges):
+    """
+    Met à jour les probabilités d'inclusion des arêtes proches d'une modification du graphe.
+
+    Seules les caractéristiques peu coûteuses sont recalculées (degrés, clustering, nombre d'arêtes,
+    densité), et uniquement au voisinage des sommets modifiés. Les centralités de proximité et
+    d'intermédiarité, le rayon et le diamètre sont conservés tels quels : ils demandent un parcours
+    complet du graphe et varient peu pour quelques arêtes.
+
+    :param graph: Le graphe après modification.
+    :param previous_graph: Le graphe avant modification, pour mettre à jour le clustering moyen.
+    :param probabilities: Les probabilités calculées sur le graphe avant modification.
+    :param edge_models: Le modèle de classification entraîné.
+    :param global_features_dict: Les mesures globales calculées sur le graphe avant modification.
+    :param changed_nodes: Les extrémités des arêtes insérées ou supprimées.
+    :param deleted_edges: Les arêtes supprimées.
+    :return: Un couple (probabilités mises à jour, mesures globales mises à jour).
+    """
+    # Le clustering d'un sommet dépend des arêtes entre ses voisins : seuls les sommets modifiés
+    # et leurs voisins changent de clustering
+    affected_nodes = set()
+    for node in changed_nodes:
+        if node in graph:
+            affected_nodes.add(node)
+            affected_nodes.update(graph.neighbors(node))
+
+    global_features = dict(global_features_dict)
+    global_features['closeness_centrality'] = dict(global_features_dict['closeness_centrality'])
+    global_features['betweenness_centrality'] = dict(global_features_dict['betweenness_centrality'])
+    global_features['number_of_nodes'] = graph.number_of_nodes()
+    global_features['number_of_edges'] = graph.number_of_edges()
+    global_features['density'] = nx.density(graph)
+
+    # Le clustering moyen est corrigé à partir du clustering des sommets touchés, sans parcourir tout le graphe
+    if graph.number_of_nodes() > 0:
+        previous_nodes = [node for node in affected_nodes if node in previous_graph]
+        clustering_sum = global_features_dict['average_clustering'] * previous_graph.number_of_nodes()
+        clustering_sum -= sum(nx.clustering(previous_graph, previous_nodes).values()) if previous_nodes else 0
+        clustering_sum += sum(nx.clustering(graph, affected_nodes).values()) if affected_nodes else 0
+        global_features['average_clustering'] = clustering_sum / graph.number_of_nodes()
+
+    # Les nouveaux sommets n'ont pas encore de centralité, on leur donne la moyenne du graphe
+    for key in ('closeness_centrality', 'betweenness_centrality'):
+        centrality = global_features[key]
+        default = float(np.mean(list(centrality.values()))) if centrality else 0.0
+        for node in affected_nodes:
+            centrality.setdefault(node, default)
+
+    new_probabilities = dict(probabilities)
+    for edge in deleted_edges:
+        new_probabilities.pop(edge, None)
+        new_probabilities.pop((edge[1], edge[0]), None)
+
+    affected_edges = sorted({_normalize_edge(edge) for edge in graph.edges(affected_nodes)})
+    if not affected_edges:
+        return new_probabilities, global_features
+
+    # Le nombre d'arêtes et la densité changent pour toutes les arêtes, mais ne font que décaler
+    # légèrement les probabilités : on ne recalcule que le voisinage de la modification
+    features = ml.edges_to_feature_matrix(graph, affected_edges, global_features)
+    probas = edge_models.predict_proba(features)[:, 1]
+    for edge, proba in zip(affected_edges, probas):
+        new_probabilities.pop((edge[1], edge[0]), None)
+        new_probabilities[edge] = float(proba)
+    profiler.count('dynamic.update_probabilities.edges', len(affected_edges))
+
+    return new_probabilities, global_features
+
+
+@profiler.profiled()
+def reconnect_tree(graph, forest, probabilities=None):
+    """
+    Relie les composantes d'une forêt couvrante avec des arêtes de remplacement du graphe.
+
+    Les arêtes qui ne créent pas de nouveau sommet de branchement sont choisies en priorité, puis
+    celles de plus forte probabilité d'inclusion.
+
+    :param graph: Le graphe d'origine, supposé connexe.
+    :param forest: La forêt couvrante à relier, modifiée en place.
+    :param probabilities: Les probabilités d'inclusion des arêtes (optionnel).
+    :return: La liste des arêtes ajoutées.
+    """
+    if probabilities is None:
+        probabilities = {}
+
+    component_of = {}
+    for index, component in enumerate(nx.connected_components(forest)):
+        for node in component:
+            component_of[node] = index
+
+    added_edges = []
+    union_find = nx.utils.UnionFind(set(component_of.values()))
+    components_number = len(set(component_of.values()))
+
+    while components_number > 1:
+        best_edge = None
+        best_key = None
+        for u, v in graph.edges():
+            if union_find[component_of[u]] == union_find[component_of[v]]:
+                continue
+            # Nombre de sommets qui passeraient au degré 3 en ajoutant l'arête
+            new_branches = (forest.degree(u) == 2) + (forest.degree(v) == 2)
+            key = (new_branches, -_edge_probability(probabilities, (u, v)))
+            if best_key is None or key < best_key:
+                best_key = key
+                best_edge = (u, v)
+
+        if best_edge is None:
+            raise nx.NetworkXError("Le graphe n'est pas connexe, impossible de relier l'arbre.")
+
+        forest.add_edge(*best_edge)
+        union_find.union(component_of[best_edge[0]], component_of[best_edge[1]])
+        added_edges.append(best_edge)
+        components_number -= 1
+
+    return added_edges
+
+
+def _swap_gain(degrees, added_edge, removed_edge):
+    """
+    Calcule la variation du nombre de sommets de branchement lors d'un échange d'arêtes.
+    """
+    delta = {}
+    for node in added_edge:
+        delta[node] = delta.get(node, 0) + 1
+    for node in removed_edge:
+        delta[node] = delta.get(node, 0) - 1
+
+    gain = 0
+    for node, change in delta.items():
+        gain += (degrees[node] + change >= 3) - (degrees[node] >= 3)
+    return gain
+
+
+@profiler.profiled()
+def local_improvement(graph, tree, nodes, radius=2, max_swaps=100):
+    """
+    Réduit localement le nombre de sommets de branchement par échanges d'arêtes autour de sommets donnés.
+
+    Pour chaque arête du graphe hors de l'arbre proche des sommets donnés, l'ajouter crée un unique cycle
+    dans l'arbre ; on retire l'arête de ce cycle qui diminue le plus le nombre de sommets de branchement.
+
+    :param graph: Le graphe d'origine.
+    :param tree: L'arbre couvrant, modifié en place.
+    :param nodes: Les sommets autour desquels chercher des améliorations.
+    :param radius: La distance maximale (dans le graphe) aux sommets donnés.
+    :param max_swaps: Le nombre maximal d'échanges effectués.
+    :return: Le nombre d'échanges effectués.
+    """
+    region = set()
+    for node in nodes:
+        if node in graph:
+            region.update(nx.single_source_shortest_path_length(graph, node, cutoff=radius))
+
+    swaps = 0
+    improved = True
+    while improved and swaps < max_swaps:
+        improved = False
+        degrees = dict(tree.degree())
+        for u, v in graph.edges(region):
+            if tree.has_edge(u, v):
+                continue
+
+            path = nx.shortest_path(tree, u, v)
+            best_gain = 0
+            best_edge = None
+            for a, b in zip(path[:-1], path[1:]):
+                gain = _swap_gain(degrees, (u, v), (a, b))
+                if gain < best_gain:
+                    best_gain = gain
+                    best_edge = (a, b)
+
+            if best_edge is not None:
+                tree.remove_edge(*best_edge)
+                tree.add_edge(u, v)
+                swaps += 1
+                improved = True
+                break
+
+    profiler.count('dynamic.local_improvement.swaps', swaps)
+    return swaps
+
+
+@profiler.profiled()
+def apply_edge_changes(graph, tree, inserted_edges=(), deleted_edges=(), probabilities=None, edge_models=None,
+                       global_features_dict=None, radius=2, max_swaps=100):
+    """
+    Répare un arbre couvrant après l'insertion et la suppression de quelques arêtes du graphe.
+
+    Les arêtes supprimées de l'arbre le coupent en composantes qui sont reliées par des arêtes de
+    remplacement, puis les sommets de branchement proches de la modification sont optimisés localement.
+    Si un modèle et ses probabilités sont fournis, seules les probabilités des arêtes voisines de la
+    modification sont recalculées.
+
+    :param graph: Le graphe avant modification.
+    :param tree: L'arbre couvrant du graphe avant modification.
+    :param inserted_edges: Les arêtes insérées.
+    :param deleted_edges: Les arêtes supprimées.
+    :param probabilities: Les probabilités d'inclusion calculées sur le graphe avant modification (optionnel).
+    :param edge_models: Le modèle de classification entraîné (optionnel, requis pour mettre à jour les probabilités).
+    :param global_features_dict: Les mesures globales du graphe avant modification (ml.calculate_global_graph_features),
+                                 requises avec edge_models : les recalculer coûterait un parcours complet du graphe.
+    :param radius: La distance aux sommets modifiés dans laquelle l'arbre est ré-optimisé.
+    :param max_swaps: Le nombre maximal d'échanges d'arêtes de la ré-optimisation locale.
+    :return: Un dictionnaire contenant le graphe ('graph'), l'arbre ('tree'), le score ('score'),
+             le temps de réparation en secondes ('time'), les probabilités ('probabilities')
+             et les mesures globales ('global_features') mises à jour.
+    """
+    start_time = time.perf_counter()
+
+    new_graph = graph.copy()
+    new_tree = tree.copy()
+    changed_nodes = set()
+
+    for u, v in deleted_edges:
+        if new_graph.has_edge(u, v):
+            new_graph.remove_edge(u, v)
+        if new_tree.has_edge(u, v):
+            new_tree.remove_edge(u, v)
+        changed_nodes.update((u, v))
+
+    for u, v in inserted_edges:
+        new_graph.add_edge(u, v)
+        changed_nodes.update((u, v))
+
+    new_tree.add_nodes_from(new_graph.nodes())
+
+    if probabilities is not None and edge_models is not None:
+        if global_features_dict is None:
+            raise ValueError("global_features_dict est requis pour mettre à jour les probabilités.")
+        probabilities, global_features_dict = update_probabilities(new_graph, graph, probabilities, edge_models,
+                                                                   global_features_dict, changed_nodes,
+                                                                   deleted_edges)
+
+    added_edges = reconnect_tree(new_graph, new_tree, probabilities)
+    for edge in added_edges:
+        changed_nodes.update(edge)
+
+    local_improvement(new_graph, new_tree, changed_nodes, radius, max_swaps)
+
+    return {
+        'graph': new_graph,
+        'tree': new_tree,
+        'score': ml.count_branch_vertices(new_tree),
+        'time': time.perf_counter() - start_time,
+        'probabilities': probabilities,
+        'global_features': global_features_dict,
+    }
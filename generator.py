@@ -0,0 +1,114 @@
+import argparse
+import math
+import os
+import random
+import sys
+import networkx as nx
+from graph_io import write_graph_to_file
+
+
+def extra_edges_count(nb_nodes, level):
+    """
+    Retourne le nombre d'arêtes à ajouter à un arbre couvrant pour un niveau de densité donné.
+
+    Dans la famille Spd_RF2, un graphe à n sommets a n - 1 + k * 1.5 * sqrt(n) arêtes (arrondi),
+    avec k le niveau de densité de 1 à 5 (ex : Spd_RF2_100_114, ..., Spd_RF2_100_174).
+
+    :param nb_nodes: Le nombre de sommets.
+    :param level: Le niveau de densité (de 1 à 5 dans les instances existantes).
+    :return: Le nombre d'arêtes hors de l'arbre couvrant.
+    """
+    return int(round(level * 1.5 * math.sqrt(nb_nodes)))
+
+
+def generate_graph(nb_nodes, level=3, seed=None):
+    """
+    Génère un graphe connexe aléatoire ayant le profil de taille et de densité des instances Spd_RF2.
+
+    Un arbre couvrant aléatoire est construit par attachement uniforme (chaque sommet est relié à un
+    sommet déjà placé), puis des arêtes sont ajoutées entre des paires de sommets tirées uniformément.
+
+    :param nb_nodes: Le nombre de sommets.
+    :param level: Le niveau de densité (voir extra_edges_count).
+    :param seed: La graine du générateur aléatoire.
+    :return: Un graphe NetworkX dont les sommets sont numérotés de 1 à nb_nodes.
+    """
+    rng = random.Random(seed)
+    nb_edges = min(nb_nodes - 1 + extra_edges_count(nb_nodes, level), nb_nodes * (nb_nodes - 1) // 2)
+
+    graph = nx.Graph()
+    graph.add_nodes_from(range(1, nb_nodes + 1))
+
+    # Arbre couvrant aléatoire, les étiquettes sont mélangées pour ne pas favoriser le sommet 1
+    labels = list(range(1, nb_nodes + 1))
+    rng.shuffle(labels)
+    for i in range(1, nb_nodes):
+        graph.add_edge(labels[i], labels[rng.randrange(i)])
+
+    # Arêtes supplémentaires
+    while graph.number_of_edges() < nb_edges:
+        u = rng.randint(1, nb_nodes)
+        v = rng.randint(1, nb_nodes)
+        if u != v:
+            graph.add_edge(u, v)
+
+    return graph
+
+
+def instance_name(graph, instance_id):
+    """
+    Retourne le nom de fichier d'une instance selon la convention Spd_RF2_n_m_id.
+
+    :param graph: Le graphe de l'instance.
+    :param instance_id: L'identifiant de l'instance.
+    :return: Le nom du fichier.
+    """
+    return 'Spd_RF2_{0}_{1}_{2}.txt'.format(graph.number_of_nodes(), graph.number_of_edges(), instance_id)
+
+
+def generate_instances(directory, sizes, levels=(1, 2, 3, 4, 5), count=1, seed=0):
+    """
+    Génère des instances pour chaque taille et niveau de densité et les écrit dans un dossier.
+
+    Les instances sont reproductibles : chacune utilise la graine seed + son identifiant.
+
+    :param directory: Le dossier de sortie.
+    :param sizes: Les nombres de sommets.
+    :param levels: Les niveaux de densité.
+    :param count: Le nombre d'instances par couple (taille, niveau).
+    :param seed: La graine de départ.
+    :return: La liste des chemins des fichiers écrits.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    instance_id = 0
+    for nb_nodes in sizes:
+        for level in levels:
+            for _ in range(count):
+                graph = generate_graph(nb_nodes, level, seed + instance_id)
+                path = os.path.join(directory, instance_name(graph, seed + instance_id))
+                write_graph_to_file(graph, path)
+                paths.append(path)
+                instance_id += 1
+    return paths
+
+
+def main():
+    """
+    Génère des instances depuis la ligne de commande.
+    """
+    parser = argparse.ArgumentParser(description="Génère des instances aléatoires de type Spd_RF2.")
+    parser.add_argument('directory', help="Dossier de sortie.")
+    parser.add_argument('sizes', type=int, nargs='+', help="Nombres de sommets.")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3, 4, 5], help="Niveaux de densité (1 à 5).")
+    parser.add_argument('--count', type=int, default=1, help="Nombre d'instances par taille et niveau.")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du générateur aléatoire.")
+    args = parser.parse_args()
+
+    paths = generate_instances(args.directory, args.sizes, args.levels, args.count, args.seed)
+    print(f"{len(paths)} instances ont été générées dans {args.directory}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
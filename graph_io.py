@@ -0,0 +1,44 @@
+import networkx as nx
+import profiler
+
+
+@profiler.profiled()
+def read_graph_from_file(file_path):
+    """
+    Lit un graphe depuis un fichier et retourne l'objet graph correspondant.
+
+    @param file_path: Chemin du fichier contenant les informations du graphe.
+    @return: Un objet NetworkX représentant le graphe lu depuis le fichier.
+    """
+    g = nx.Graph()
+    with open(file_path, 'r') as file:
+        lines = file.readlines()
+
+        # Lire le nombre de sommets depuis la première ligne
+        num_vertices = int(lines[0].split()[0])
+
+        # Ajouter les sommets au graphe
+        for i in range(1, num_vertices + 1):
+            g.add_node(i)
+
+        # Ajouter les arêtes au graphe
+        for line in lines[1:]:
+            edge = list(map(int, line.split()[:2]))
+            g.add_edge(edge[0], edge[1])
+
+    return g
+
+
+@profiler.profiled()
+def write_graph_to_file(graph, file_path):
+    """
+    Écrit un graphe dans un fichier au format des instances (nombre de sommets et d'arêtes, puis une arête par ligne).
+
+    @param graph: Le graphe à écrire, ses sommets doivent être numérotés de 1 à n.
+    @param file_path: Chemin du fichier à écrire.
+    @return: None
+    """
+    with open(file_path, 'w') as file:
+        file.write('{0} {1}\n'.format(graph.number_of_nodes(), graph.number_of_edges()))
+        for u, v in sorted((min(e), max(e)) for e in graph.edges()):
+            file.write('{0} {1}\n'.format(u, v))
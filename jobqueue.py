@@ -0,0 +1,455 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import selection
+import solution_cache
+import solvepl
+from graph_io import read_graph_from_file, write_graph_to_file
+
+# Statuts d'une tâche
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    graph TEXT NOT NULL,
+    method TEXT NOT NULL,
+    time_limit REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    heartbeat REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    score REAL,
+    seconds REAL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (graph, method)
+)
+"""
+
+
+def connect(db_path):
+    """
+    Ouvre la file de tâches SQLite et crée sa table si besoin.
+
+    Le journal SQLite par défaut (rollback) est conservé : le mode WAL ne fonctionne pas sur un système de
+    fichiers partagé entre plusieurs machines.
+
+    :param db_path: Le chemin de la base, sur le dossier partagé.
+    :return: La connexion, en mode autocommit (les transactions sont ouvertes explicitement).
+    """
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    connection.execute(SCHEMA)
+    # Bases créées avant l'ajout de la colonne cached
+    columns = [row[1] for row in connection.execute('PRAGMA table_info(jobs)')]
+    if 'cached' not in columns:
+        connection.execute('ALTER TABLE jobs ADD COLUMN cached INTEGER NOT NULL DEFAULT 0')
+    return connection
+
+
+def add_jobs(db_path, graph_paths, methods, time_limit):
+    """
+    Ajoute une tâche par couple (graphe, méthode), les couples déjà présents sont ignorés.
+
+    :param db_path: Le chemin de la base.
+    :param graph_paths: Les chemins des graphes.
+    :param methods: Les méthodes (voir selection.METHODS).
+    :param time_limit: La limite de temps de chaque tâche.
+    :return: Le nombre de tâches ajoutées.
+    """
+    connection = connect(db_path)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        before = connection.total_changes
+        connection.executemany('INSERT OR IGNORE INTO jobs (graph, method, time_limit) VALUES (?, ?, ?)',
+                               [(path, method, time_limit) for path in graph_paths for method in methods])
+        added = connection.total_changes - before
+        connection.execute('COMMIT')
+    finally:
+        connection.close()
+    return added
+
+
+def claim_job(connection, worker_id):
+    """
+    Réserve la prochaine tâche en attente pour un processus.
+
+    :param connection: La connexion à la base.
+    :param worker_id: L'identifiant du processus.
+    :return: Un quadruplet (id, graphe, méthode, limite de temps) ou None s'il n'y a pas de tâche en attente.
+    """
+    # BEGIN IMMEDIATE verrouille la base en écriture : deux processus ne peuvent pas réserver la même tâche
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        row = connection.execute('SELECT id, graph, method, time_limit FROM jobs WHERE status = ? ORDER BY id LIMIT 1',
+                                 (PENDING,)).fetchone()
+        if row is not None:
+            connection.execute('UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, attempts = attempts + 1 '
+                               'WHERE id = ?', (RUNNING, worker_id, time.time(), row[0]))
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    return row
+
+
+def send_heartbeat(connection, job_id, worker_id):
+    """
+    Signale qu'un processus travaille toujours sur une tâche.
+
+    :param connection: La connexion à la base.
+    :param job_id: L'identifiant de la tâche.
+    :param worker_id: L'identifiant du processus.
+    :return: False si la tâche a été reprise par un autre processus.
+    """
+    cursor = connection.execute('UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = ?',
+                                (time.time(), job_id, worker_id, RUNNING))
+    return cursor.rowcount == 1
+
+
+def requeue_stale_jobs(connection, stale_timeout, max_attempts):
+    """
+    Remet en attente les tâches dont le processus ne donne plus signe de vie (arrêt brutal, machine perdue).
+
+    Les horloges des machines doivent être à peu près synchronisées : stale_timeout doit rester grand
+    devant leur décalage et devant l'intervalle des signaux de vie.
+
+    :param connection: La connexion à la base.
+    :param stale_timeout: Le délai sans signal de vie, en secondes, après lequel une tâche est reprise.
+    :param max_attempts: Le nombre d'essais après lequel une tâche est marquée en échec.
+    :return: Le nombre de tâches reprises.
+    """
+    limit = time.time() - stale_timeout
+    connection.execute('BEGIN IMMEDIATE')
+    cursor = connection.execute(
+        "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, "
+        "error = 'processus sans signe de vie' WHERE status = ? AND heartbeat < ?",
+        (max_attempts, FAILED, PENDING, RUNNING, limit))
+    connection.execute('COMMIT')
+    return cursor.rowcount
+
+
+def finish_job(connection, job_id, worker_id, score=None, seconds=None, error=None, max_attempts=3, cached=False):
+    """
+    Enregistre le résultat d'une tâche. Une tâche en erreur est remise en attente tant qu'il reste des essais.
+
+    :param connection: La connexion à la base.
+    :param job_id: L'identifiant de la tâche.
+    :param worker_id: L'identifiant du processus.
+    :param score: Le score obtenu.
+    :param seconds: Le temps de résolution.
+    :param error: Le message d'erreur si la tâche a échoué.
+    :param max_attempts: Le nombre maximal d'essais d'une tâche.
+    :param cached: Vrai si l'arbre vient du cache des arbres résolus et non de la méthode.
+    :return: None
+    """
+    if error is None:
+        connection.execute('UPDATE jobs SET status = ?, score = ?, seconds = ?, cached = ?, error = NULL '
+                           'WHERE id = ? AND worker = ?', (DONE, score, seconds, int(cached), job_id, worker_id))
+    else:
+        connection.execute('UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, '
+                           'error = ? WHERE id = ? AND worker = ?',
+                           (max_attempts, FAILED, PENDING, error, job_id, worker_id))
+
+
+def count_jobs(connection):
+    """
+    Compte les tâches par statut.
+
+    :param connection: La connexion à la base.
+    :return: Un dictionnaire {statut: nombre}.
+    """
+    return dict(connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+def _heartbeat_loop(db_path, job_id, worker_id, interval, stop):
+    """
+    Envoie des signaux de vie jusqu'à la fin de la tâche (fil séparé, avec sa propre connexion).
+    """
+    connection = connect(db_path)
+    try:
+        while not stop.wait(interval):
+            send_heartbeat(connection, job_id, worker_id)
+    finally:
+        connection.close()
+
+
+def run_job(graph_path, method, time_limit, output_dir, path_to_cplex, cache_dir, solve=None):
+    """
+    Résout un graphe et écrit l'arbre obtenu au format des instances dans output_dir/<méthode>/.
+
+    Un arbre renvoyé par le cache peut venir d'une autre méthode : il n'est pas écrit dans le dossier de la méthode.
+
+    :param graph_path: Le chemin du graphe.
+    :param method: La méthode.
+    :param time_limit: La limite de temps.
+    :param output_dir: Le dossier des arbres résolus.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param cache_dir: Le dossier du cache des arbres résolus (None pour ne pas l'utiliser).
+    :param solve: La fonction de résolution, de même signature que selection.solve_with_cache (par défaut).
+    :return: Un triplet (score, temps de résolution, vrai si l'arbre vient du cache).
+    """
+    if solve is None:
+        solve = selection.solve_with_cache
+    graph = read_graph_from_file(graph_path)
+    start_time = time.time()
+    tree, score = solve(graph, method, time_limit, path_to_cplex, cache_dir=cache_dir)
+    seconds = time.time() - start_time
+    cached = cache_dir is not None and solution_cache.last_cache_hit
+
+    if score >= 0 and not cached:
+        method_dir = os.path.join(output_dir, method)
+        os.makedirs(method_dir, exist_ok=True)
+        write_graph_to_file(tree, os.path.join(method_dir, os.path.basename(graph_path)))
+
+    return score, seconds, cached
+
+
+def _job_process(sender, log_path, job_args, solve):
+    """
+    Exécute run_job dans un processus séparé et envoie son résultat, ou la trace de son erreur, au processus parent.
+    """
+    solvepl.LOG_PATH = log_path
+    try:
+        sender.send(('ok', run_job(*job_args, solve=solve)))
+    except Exception:
+        sender.send(('error', traceback.format_exc()))
+    finally:
+        sender.close()
+
+
+def run_job_with_timeout(graph_path, method, time_limit, output_dir, path_to_cplex, cache_dir, grace_period=30,
+                         solve=None):
+    """
+    Exécute run_job dans un processus séparé, arrêté s'il dépasse la limite de temps de la tâche.
+
+    La limite de temps n'est transmise qu'à CPLEX : la construction des modèles, l'heuristique sur les cycles et les
+    méthodes d'apprentissage ne sont bornées que par l'arrêt du processus. Un processus arrêté compte comme une
+    résolution sans arbre dans la limite de temps (score -1), comme dans les benchmarks.
+
+    :param graph_path: Le chemin du graphe.
+    :param method: La méthode.
+    :param time_limit: La limite de temps.
+    :param output_dir: Le dossier des arbres résolus.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param cache_dir: Le dossier du cache des arbres résolus (None pour ne pas l'utiliser).
+    :param grace_period: Le délai accordé en plus de la limite de temps (démarrage du processus, lecture du graphe,
+                         lancement de CPLEX...).
+    :param solve: La fonction de résolution (voir run_job).
+    :return: Un triplet (score, temps de résolution, vrai si l'arbre vient du cache).
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    job_args = (graph_path, method, time_limit, output_dir, path_to_cplex, cache_dir)
+    process = multiprocessing.Process(target=_job_process, args=(sender, solvepl.LOG_PATH, job_args, solve))
+    start_time = time.time()
+    process.start()
+    sender.close()
+
+    try:
+        if not receiver.poll(time_limit + grace_period):
+            # CPLEX, lancé par PuLP dans un sous-processus, s'arrête de lui-même à sa propre limite de temps
+            process.terminate()
+            process.join()
+            return -1, time.time() - start_time, False
+        try:
+            kind, value = receiver.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError("Processus de la tâche arrêté sans résultat (code {0}).".format(process.exitcode))
+    finally:
+        receiver.close()
+
+    process.join()
+    if kind == 'error':
+        raise RuntimeError(value)
+    return value
+
+
+def run_worker(db_path, output_dir, path_to_cplex, cache_dir=None,
+               heartbeat_interval=10, stale_timeout=120, max_attempts=3, poll_interval=5, exit_when_empty=True,
+               grace_period=30, solve=None):
+    """
+    Réserve et exécute des tâches jusqu'à ce que la file soit vide.
+
+    Plusieurs processus, sur une ou plusieurs machines partageant le dossier de la base, peuvent tourner en même temps.
+
+    :param db_path: Le chemin de la base.
+    :param output_dir: Le dossier des arbres résolus.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param cache_dir: Le dossier du cache des arbres résolus, à placer sur le dossier partagé (None par défaut :
+                      un arbre optimal en cache est renvoyé quelle que soit la méthode, ce qui fausse un benchmark).
+    :param heartbeat_interval: L'intervalle des signaux de vie, en secondes.
+    :param stale_timeout: Le délai sans signal de vie après lequel une tâche est reprise.
+    :param max_attempts: Le nombre maximal d'essais d'une tâche.
+    :param poll_interval: L'attente entre deux recherches de tâche quand aucune n'est disponible.
+    :param exit_when_empty: Arrête le processus quand plus aucune tâche n'est en attente ou en cours.
+    :param grace_period: Le délai après la limite de temps d'une tâche au-delà duquel son processus est arrêté.
+    :param solve: La fonction de résolution (voir run_job), à définir au niveau d'un module pour être transmise
+                  au processus de la tâche.
+    :return: Le nombre de tâches exécutées.
+    """
+    worker_id = '{0}:{1}'.format(socket.gethostname(), os.getpid())
+    # Journal CPLEX propre au processus, pour ne pas lire celui d'une autre résolution
+    os.makedirs(output_dir, exist_ok=True)
+    solvepl.LOG_PATH = os.path.join(output_dir, 'cplex_{0}.log'.format(worker_id.replace(':', '_')))
+
+    connection = connect(db_path)
+    executed = 0
+    try:
+        while True:
+            requeue_stale_jobs(connection, stale_timeout, max_attempts)
+            job = claim_job(connection, worker_id)
+            if job is None:
+                counts = count_jobs(connection)
+                if exit_when_empty and not counts.get(PENDING) and not counts.get(RUNNING):
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            job_id, graph_path, method, time_limit = job
+            print(f"[{worker_id}] {os.path.basename(graph_path)} avec {method}")
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=_heartbeat_loop,
+                                         args=(db_path, job_id, worker_id, heartbeat_interval, stop), daemon=True)
+            heartbeat.start()
+            try:
+                score, seconds, cached = run_job_with_timeout(graph_path, method, time_limit, output_dir,
+                                                              path_to_cplex, cache_dir, grace_period, solve)
+            except Exception:
+                stop.set()
+                heartbeat.join()
+                finish_job(connection, job_id, worker_id, error=traceback.format_exc(), max_attempts=max_attempts)
+            else:
+                stop.set()
+                heartbeat.join()
+                finish_job(connection, job_id, worker_id, score, seconds, max_attempts=max_attempts, cached=cached)
+            executed += 1
+    finally:
+        connection.close()
+
+    return executed
+
+
+def export_results(db_path, csv_path, runs_path=None):
+    """
+    Écrit les résultats au format des fichiers bench_*.csv (une colonne Score et Temps par méthode, -1 en cas d'échec).
+
+    Seules les tâches terminées mesurent leur méthode (score -1 si aucun arbre n'a été trouvé dans la limite de
+    temps). Les tâches en échec (erreur, processus disparu) et celles résolues par le cache sont laissées vides
+    dans le fichier CSV et ne sont pas ajoutées au fichier des exécutions.
+
+    :param db_path: Le chemin de la base.
+    :param csv_path: Le fichier CSV à écrire.
+    :param runs_path: Le fichier des nouvelles exécutions du sélecteur, complété s'il est donné (optionnel).
+    :return: Le nombre de graphes écrits.
+    """
+    connection = connect(db_path)
+    try:
+        rows = connection.execute('SELECT graph, method, status, score, seconds, time_limit FROM jobs '
+                                  'WHERE status IN (?, ?) AND cached = 0 ORDER BY id', (DONE, FAILED)).fetchall()
+    finally:
+        connection.close()
+
+    labels = {method: label for label, method in selection.CSV_METHODS.items()}
+    methods = [method for method in selection.METHODS if any(row[1] == method for row in rows)]
+    results = {}
+    for graph_path, method, status, score, seconds, time_limit in rows:
+        name = os.path.basename(graph_path)
+        by_method = results.setdefault(name, {})
+        if status == FAILED:
+            continue
+        by_method[method] = (score, round(seconds, 2)) if score >= 0 else (-1, -1)
+        if runs_path is not None:
+            selection.record_run(name, method, score, seconds, time_limit, runs_path)
+
+    with open(csv_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        header = ['Nom du graphe']
+        for method in methods:
+            header += ['Score ' + labels[method], 'Temps ' + labels[method]]
+        writer.writerow(header)
+        for name, by_method in results.items():
+            row = [name]
+            for method in methods:
+                row += list(by_method.get(method, ('', '')))
+            writer.writerow(row)
+
+    return len(results)
+
+
+def main():
+    """
+    Gère la file de tâches depuis la ligne de commande.
+    """
+    parser = argparse.ArgumentParser(description="File de tâches de résolution partagée entre plusieurs machines.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help="Ajoute les graphes d'une liste (ex : list_train_graph.txt).")
+    add_parser.add_argument('db', help="Chemin de la base SQLite, sur le dossier partagé.")
+    add_parser.add_argument('list', help="Fichier contenant un nom de graphe par ligne.")
+    add_parser.add_argument('--graph-dir', default='instances/Spd_Inst_Rid_Final2', help="Dossier des graphes.")
+    add_parser.add_argument('--methods', nargs='+', default=['flot'], choices=selection.METHODS, help="Méthodes.")
+    add_parser.add_argument('--time-limit', type=float, default=120, help="Limite de temps de chaque tâche.")
+
+    worker_parser = subparsers.add_parser('worker', help="Lance des processus exécutant les tâches.")
+    worker_parser.add_argument('db', help="Chemin de la base SQLite, sur le dossier partagé.")
+    worker_parser.add_argument('--output-dir', default='instances/Queue_solved', help="Dossier des arbres résolus.")
+    worker_parser.add_argument('--cplex', default=None, help="Chemin vers CPLEX.")
+    worker_parser.add_argument('--cache-dir', default=None,
+                               help="Dossier du cache des arbres résolus, sur le dossier partagé (désactivé par défaut).")
+    worker_parser.add_argument('--workers', type=int, default=1, help="Nombre de processus sur cette machine.")
+    worker_parser.add_argument('--stale-timeout', type=float, default=120,
+                               help="Délai sans signal de vie après lequel une tâche est reprise.")
+    worker_parser.add_argument('--grace-period', type=float, default=30,
+                               help="Délai après la limite de temps d'une tâche au-delà duquel elle est arrêtée.")
+
+    status_parser = subparsers.add_parser('status', help="Affiche le nombre de tâches par statut.")
+    status_parser.add_argument('db', help="Chemin de la base SQLite.")
+
+    export_parser = subparsers.add_parser('export', help="Écrit les résultats au format bench_*.csv.")
+    export_parser.add_argument('db', help="Chemin de la base SQLite.")
+    export_parser.add_argument('csv', help="Fichier CSV à écrire.")
+    export_parser.add_argument('--runs', default=None, help="Complète aussi ce fichier d'exécutions (ex : bench_runs.csv).")
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        with open(args.list, 'r') as file:
+            graph_paths = [os.path.join(args.graph_dir, line.strip()) for line in file if line.strip()]
+        added = add_jobs(args.db, graph_paths, args.methods, args.time_limit)
+        print(f"{added} tâches ajoutées à {args.db}.")
+    elif args.command == 'worker':
+        worker_args = (args.db, args.output_dir, args.cplex, args.cache_dir)
+        worker_kwargs = {'stale_timeout': args.stale_timeout, 'grace_period': args.grace_period}
+        if args.workers == 1:
+            run_worker(*worker_args, **worker_kwargs)
+        else:
+            processes = [multiprocessing.Process(target=run_worker, args=worker_args, kwargs=worker_kwargs)
+                         for _ in range(args.workers)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+    elif args.command == 'status':
+        connection = connect(args.db)
+        for status, number in sorted(count_jobs(connection).items()):
+            print(f"{status} : {number}")
+        connection.close()
+    else:
+        written = export_results(args.db, args.csv, args.runs)
+        print(f"{written} graphes écrits dans {args.csv}.")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
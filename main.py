@@ -7,6 +7,8 @@ import cycles
 import ml
 import joblib
 import sys
+import profiler
+from graph_io import read_graph_from_file
 
 PATH_TO_CPLEX = r'C:\Program Files\IBM\ILOG\CPLEX_Studio2211\cplex\bin\x64_win64\cplex.exe'
 
@@ -38,32 +40,6 @@ def create_list_graph(graph_dic):
     print(f"{nombre_fichiers_selectionnes} fichiers ont été sélectionnés et enregistrés dans {fichier_sortie}.")
 
 
-def read_graph_from_file(file_path):
-    """
-    Lit un graphe depuis un fichier et retourne l'objet graph correspondant.
-
-    @param file_path: Chemin du fichier contenant les informations du graphe.
-    @return: Un objet NetworkX représentant le graphe lu depuis le fichier.
-    """
-    g = nx.Graph()
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-
-        # Lire le nombre de sommets depuis la première ligne
-        num_vertices = int(lines[0].split()[0])
-
-        # Ajouter les sommets au graphe
-        for i in range(1, num_vertices + 1):
-            g.add_node(i)
-
-        # Ajouter les arêtes au graphe
-        for line in lines[1:]:
-            edge = list(map(int, line.split()[:2]))
-            g.add_edge(edge[0], edge[1])
-
-    return g
-
-
 def draw_tree(nb_node, x):
     """
     Dessine un graph à partir du dictionnaire des arrêtes et le renvoie
@@ -120,6 +96,40 @@ def train_and_save_edge_models(path_to_list_graph):
     return edge_models
 
 
+def iter_training_graphs(path_to_list_graph):
+    """
+    Lit un par un les graphes listés dans path_to_list_graph et leurs arbres résolus.
+
+    :param path_to_list_graph: Le chemin vers le fichier contenant la liste des graphes à utiliser.
+    :return: Un générateur de couples (graphe, arbre optimal).
+    """
+    with open(path_to_list_graph, 'r') as file:
+        for line in file:
+            filename = line.strip()
+            if not filename:
+                continue
+            yield (read_graph_from_file("instances/Spd_Inst_Rid_Final2/" + filename),
+                   read_graph_from_file("instances/Low_graph_solved/" + filename))
+
+
+def train_and_save_edge_models_streaming(path_to_list_graph, shard_dir='shards', shard_size=1000000):
+    """
+    Entraîne un modèle sans charger toutes les arêtes en mémoire : les caractéristiques sont écrites
+    sur disque par blocs de shard_size arêtes, puis XGBoost s'entraîne à partir de ces blocs.
+
+    :param path_to_list_graph: Le chemin vers le fichier contenant la liste des graphes à utiliser.
+    :param shard_dir: Le dossier des blocs et du cache de XGBoost.
+    :param shard_size: Le nombre d'arêtes par bloc, qui borne la mémoire utilisée.
+    :return: Le modèle entraîné.
+    """
+    shard_paths = ml.write_feature_shards(iter_training_graphs(path_to_list_graph), shard_dir, shard_size)
+    edge_models = ml.train_edge_models_streaming(shard_paths, os.path.join(shard_dir, 'cache'))
+
+    # Sauvegarder les modèles entraînés
+    joblib.dump(edge_models, 'edge_models.joblib')
+    return edge_models
+
+
 def main():
     """
     Fonction principale exécutant les étapes du script.
@@ -190,6 +200,10 @@ def main():
     list_node_high_degree = [node for node, degree in degrees.items() if degree >= 3]
     print("Score Machine Learning :", len(list_node_high_degree))
 
+    # Écriture de la trace si l'instrumentation est activée (variable MBVST_PROFILE)
+    if profiler.is_enabled():
+        print("Trace écrite dans :", profiler.dump())
+
     return 0
 
 
@@ -1,10 +1,17 @@
+import glob
+import os
+import tempfile
 import numpy as np
 import networkx as nx
+import xgboost as xgb
+from joblib import Memory, Parallel, delayed, effective_n_jobs
 from sklearn.ensemble import AdaBoostClassifier
 from xgboost import XGBClassifier
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import GroupKFold, ParameterGrid
+import profiler
 
 
+@profiler.profiled()
 def calculate_global_graph_features(graph):
     """
     Calcule les mesures globales du graphe et les stocke dans un dictionnaire.
@@ -15,14 +22,17 @@ def calculate_global_graph_features(graph):
     global_features = {}
 
     # Calcul des mesures de centralité
-    global_features['closeness_centrality'] = nx.closeness_centrality(graph)
-    global_features['betweenness_centrality'] = nx.betweenness_centrality(graph)
+    with profiler.section('ml.closeness_centrality'):
+        global_features['closeness_centrality'] = nx.closeness_centrality(graph)
+    with profiler.section('ml.betweenness_centrality'):
+        global_features['betweenness_centrality'] = nx.betweenness_centrality(graph)
 
     # Informations globales sur le graphe
     global_features['number_of_nodes'] = graph.number_of_nodes()
     global_features['number_of_edges'] = graph.number_of_edges()
-    global_features['radius'] = nx.radius(graph)
-    global_features['diameter'] = nx.diameter(graph)
+    with profiler.section('ml.radius_diameter'):
+        global_features['radius'] = nx.radius(graph)
+        global_features['diameter'] = nx.diameter(graph)
     global_features['density'] = nx.density(graph)
     global_features['average_clustering'] = nx.average_clustering(graph)
 
@@ -76,6 +86,65 @@ def edge_to_features(graph, edge, global_features_dict):
     return features
 
 
+def edges_to_feature_matrix(graph, edges, global_features_dict, dtype=np.float64):
+    """
+    Calcule en une fois les caractéristiques d'une liste d'arêtes (mêmes valeurs que edge_to_features).
+
+    :param graph: Le graphe d'origine.
+    :param edges: La liste des arêtes.
+    :param global_features_dict: Le dictionnaire contenant toutes les informations du graph.
+    :param dtype: Le type des valeurs de la matrice.
+    :return: Une matrice NumPy contiguë avec une ligne par arête.
+    """
+    # Mesures par sommet calculées une seule fois, le clustering seulement pour les extrémités des arêtes
+    degree = dict(graph.degree())
+    degree_centrality = nx.degree_centrality(graph)
+    closeness_centrality_dict = global_features_dict['closeness_centrality']
+    betweenness_centrality_dict = global_features_dict['betweenness_centrality']
+    clustering = nx.clustering(graph, {node for edge in edges for node in edge})
+
+    global_values = [global_features_dict['number_of_nodes'], global_features_dict['number_of_edges'],
+                     global_features_dict['radius'], global_features_dict['diameter'],
+                     global_features_dict['density'], global_features_dict['average_clustering']]
+
+    features = np.empty((len(edges), 16), dtype=dtype)
+    for row, (node1, node2) in enumerate(edges):
+        features[row, :10] = (degree[node1], degree[node2],
+                              degree_centrality[node1], degree_centrality[node2],
+                              closeness_centrality_dict[node1], closeness_centrality_dict[node2],
+                              betweenness_centrality_dict[node1], betweenness_centrality_dict[node2],
+                              clustering[node1], clustering[node2])
+    features[:, 10:] = global_values
+
+    return features
+
+
+@profiler.profiled()
+def build_feature_matrix(X_graph, Y_tree):
+    """
+    Construit la matrice de caractéristiques et les étiquettes de toutes les arêtes d'une liste de graphes.
+
+    :param X_graph: Liste de graphes d'entraînement.
+    :param Y_tree: Liste des arbres optimaux correspondants.
+    :return: Un quadruplet (X en float32, y en int8, indice du graphe de chaque ligne, liste des arêtes de chaque graphe).
+    """
+    X_blocks = []
+    y_blocks = []
+    group_blocks = []
+    edge_lists = []
+    for index, (graph, optimal_tree) in enumerate(zip(X_graph, Y_tree)):
+        edges = list(graph.edges())
+        global_features_dict = calculate_global_graph_features(graph)
+        X_blocks.append(edges_to_feature_matrix(graph, edges, global_features_dict, np.float32))
+        y_blocks.append(np.fromiter((optimal_tree.has_edge(*edge) for edge in edges), dtype=np.int8, count=len(edges)))
+        group_blocks.append(np.full(len(edges), index, dtype=np.int32))
+        edge_lists.append(edges)
+
+    X = np.ascontiguousarray(np.concatenate(X_blocks))
+    return X, np.concatenate(y_blocks), np.concatenate(group_blocks), edge_lists
+
+
+@profiler.profiled()
 def train_edge_models(X_graph, Y_tree):
     """
     Entraîne un modèle de classification pour prédire les arêtes dans un arbre optimal.
@@ -91,22 +160,248 @@ def train_edge_models(X_graph, Y_tree):
         print("New Graph : ", cpt)
         cpt += 1
         global_features_dict = calculate_global_graph_features(graph)
-        for edge in graph.edges():
-            features = edge_to_features(graph, edge, global_features_dict)
-            X_features.append(features)
-            if edge in optimal_tree.edges():
-                Y_bool.append(1)
-            else:
-                Y_bool.append(0)
+        with profiler.section('ml.train_edge_models.features'):
+            for edge in graph.edges():
+                features = edge_to_features(graph, edge, global_features_dict)
+                X_features.append(features)
+                if edge in optimal_tree.edges():
+                    Y_bool.append(1)
+                else:
+                    Y_bool.append(0)
+        profiler.count('ml.train_edge_models.edges', graph.number_of_edges())
 
     # edge_models = AdaBoostClassifier(n_estimators=100, learning_rate=0.1, random_state=42)
     edge_models = XGBClassifier(n_estimators=100, learning_rate=0.1, random_state=42)
 
-    model = edge_models.fit(np.array(X_features), np.array(Y_bool))
+    with profiler.section('ml.train_edge_models.fit', samples=len(Y_bool)):
+        model = edge_models.fit(np.array(X_features), np.array(Y_bool))
+
+    return model
+
+
+@profiler.profiled()
+def write_feature_shards(graph_pairs, shard_dir, shard_size=1000000):
+    """
+    Calcule les caractéristiques et étiquettes des arêtes et les écrit sur disque par blocs (shards).
+
+    Les graphes sont parcourus un par un et les arêtes d'un graphe sont réparties sur plusieurs blocs si besoin :
+    la mémoire utilisée est bornée par la taille d'un bloc et les caractéristiques du graphe en cours.
+
+    :param graph_pairs: Un itérable (éventuellement paresseux) de couples (graphe, arbre optimal).
+    :param shard_dir: Le dossier des blocs.
+    :param shard_size: Le nombre maximal d'arêtes d'un bloc.
+    :return: La liste des chemins des blocs écrits.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_paths = []
+    X_blocks = []
+    y_blocks = []
+    nb_rows = 0
+
+    def flush():
+        path = os.path.join(shard_dir, 'shard_{0:05d}.npz'.format(len(shard_paths)))
+        np.savez(path, X=np.concatenate(X_blocks), y=np.concatenate(y_blocks))
+        shard_paths.append(path)
+        X_blocks.clear()
+        y_blocks.clear()
+
+    for graph, optimal_tree in graph_pairs:
+        edges = list(graph.edges())
+        global_features_dict = calculate_global_graph_features(graph)
+        X_graph = edges_to_feature_matrix(graph, edges, global_features_dict, np.float32)
+        y_graph = np.fromiter((optimal_tree.has_edge(*edge) for edge in edges), dtype=np.int8, count=len(edges))
+
+        # Découpage du graphe à la frontière du bloc en cours
+        start = 0
+        while start < len(edges):
+            end = min(len(edges), start + shard_size - nb_rows)
+            X_blocks.append(X_graph[start:end])
+            y_blocks.append(y_graph[start:end])
+            nb_rows += end - start
+            start = end
+            if nb_rows == shard_size:
+                flush()
+                nb_rows = 0
+
+    if X_blocks:
+        flush()
+
+    return shard_paths
+
+
+class ShardIterator(xgb.DataIter):
+    """
+    Itérateur XGBoost chargeant les blocs de caractéristiques un par un (mémoire externe).
+    """
+
+    def __init__(self, shard_paths, cache_prefix):
+        """
+        :param shard_paths: Les chemins des blocs écrits par write_feature_shards.
+        :param cache_prefix: Le préfixe des fichiers de cache de XGBoost.
+        """
+        self.shard_paths = shard_paths
+        self.position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self.position == len(self.shard_paths):
+            return 0
+        with np.load(self.shard_paths[self.position]) as shard:
+            input_data(data=shard['X'], label=shard['y'])
+        self.position += 1
+        return 1
+
+    def reset(self):
+        self.position = 0
+
+
+@profiler.profiled()
+def train_edge_models_streaming(shard_paths, cache_dir, n_estimators=100, learning_rate=0.1):
+    """
+    Entraîne le modèle XGBoost à partir des blocs écrits sur disque, sans charger toutes les données en mémoire.
+
+    Le modèle obtenu est un XGBClassifier, utilisable et sauvegardable avec joblib comme celui de train_edge_models.
+
+    :param shard_paths: Les chemins des blocs, ou le dossier les contenant.
+    :param cache_dir: Le dossier du cache de mémoire externe de XGBoost.
+    :param n_estimators: Le nombre d'arbres.
+    :param learning_rate: Le taux d'apprentissage.
+    :return: Le modèle entraîné.
+    """
+    if isinstance(shard_paths, str):
+        shard_paths = sorted(glob.glob(os.path.join(shard_paths, 'shard_*.npz')))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    iterator = ShardIterator(shard_paths, os.path.join(cache_dir, 'cache'))
+    dtrain = xgb.DMatrix(iterator)
+
+    params = {'objective': 'binary:logistic', 'eta': learning_rate, 'seed': 42, 'tree_method': 'hist'}
+    with profiler.section('ml.train_edge_models_streaming.fit', samples=dtrain.num_row()):
+        booster = xgb.train(params, dtrain, num_boost_round=n_estimators)
+
+    # Chargement du booster dans l'interface scikit-learn pour garder la même utilisation
+    model = XGBClassifier(n_estimators=n_estimators, learning_rate=learning_rate, random_state=42)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.json')
+        booster.save_model(path)
+        model.load_model(path)
 
     return model
 
 
+# Hyperparamètres explorés par défaut lors de la recherche
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [90, 100, 110],
+    'learning_rate': [0.1, 0.15],
+    'max_depth': [4, 5, 6],
+    'min_child_weight': [2, 3, 4],
+    'subsample': [1.0],
+    'colsample_bytree': [1.0],
+    'gamma': [0.1, 0.2, 0.3],
+}
+
+
+def _graph_rows(groups):
+    """
+    Retourne pour chaque graphe l'intervalle [début, fin) de ses lignes dans la matrice de caractéristiques.
+    """
+    bounds = np.flatnonzero(np.diff(groups)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(groups)]))
+    return {int(groups[start]): (int(start), int(end)) for start, end in zip(starts, ends)}
+
+
+def _evaluate_candidate(params, X, y, graph_rows, train_graphs, validation_graphs, edge_lists, n_threads):
+    """
+    Entraîne un modèle sur des graphes et retourne le nombre moyen de sommets de branchement sur d'autres.
+    """
+    rows = np.concatenate([np.arange(*graph_rows[index]) for index in train_graphs])
+    model = XGBClassifier(random_state=42, n_jobs=n_threads, **params)
+    model.fit(X[rows], y[rows])
+
+    scores = []
+    for index in validation_graphs:
+        start, end = graph_rows[index]
+        probas = model.predict_proba(X[start:end])[:, 1]
+        tree = build_minimum_degree_spanning_tree(dict(zip(edge_lists[index], probas.tolist())))
+        scores.append(count_branch_vertices(tree))
+
+    return float(np.mean(scores))
+
+
+@profiler.profiled()
+def tune_edge_models(X, y, groups, edge_lists, param_grid=None, n_folds=5, eta=3, min_graphs=None,
+                     n_jobs=-1, cache_dir=None):
+    """
+    Recherche les hyperparamètres de XGBoost par divisions successives (successive halving).
+
+    Tous les candidats sont d'abord évalués avec peu de graphes d'entraînement, puis seul le meilleur
+    tiers (1 / eta) est conservé et réévalué avec eta fois plus de graphes, jusqu'à utiliser tous les
+    graphes. Les plis sont construits par graphe : les arêtes d'un même graphe ne sont jamais à la fois
+    en entraînement et en validation. Un candidat est évalué par le nombre moyen de sommets de
+    branchement des arbres construits sur les graphes de validation.
+
+    :param X: La matrice de caractéristiques (voir build_feature_matrix).
+    :param y: Les étiquettes.
+    :param groups: L'indice du graphe de chaque ligne, les lignes d'un même graphe étant consécutives.
+    :param edge_lists: La liste des arêtes de chaque graphe, dans l'ordre des lignes.
+    :param param_grid: Les hyperparamètres à explorer (DEFAULT_PARAM_GRID par défaut).
+    :param n_folds: Le nombre de plis de la validation croisée.
+    :param eta: Le facteur de division du nombre de candidats à chaque tour.
+    :param min_graphs: Le nombre de graphes d'entraînement du premier tour (par défaut, calculé pour finir avec tous les graphes).
+    :param n_jobs: Le nombre de cœurs utilisés (convention de joblib : -1 pour tous, -2 pour tous sauf un...).
+    :param cache_dir: Dossier de cache des évaluations, pour ne pas réévaluer un candidat lors d'une nouvelle recherche (optionnel).
+    :return: Un couple (modèle entraîné sur toutes les données avec les meilleurs hyperparamètres, historique des tours).
+    """
+    candidates = list(ParameterGrid(param_grid or DEFAULT_PARAM_GRID))
+    graph_rows = _graph_rows(groups)
+    graph_ids = np.array(sorted(graph_rows))
+    if len(graph_ids) < 2:
+        raise ValueError("La recherche d'hyperparamètres demande au moins 2 graphes d'entraînement "
+                         "({0} fourni).".format(len(graph_ids)))
+    folds = [(graph_ids[train], graph_ids[validation])
+             for train, validation in GroupKFold(n_splits=min(n_folds, len(graph_ids))).split(graph_ids, groups=graph_ids)]
+
+    n_cores = effective_n_jobs(n_jobs)
+    evaluate = Memory(cache_dir, verbose=0).cache(_evaluate_candidate) if cache_dir else _evaluate_candidate
+
+    nb_rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(eta))))
+    max_graphs = min(len(train) for train, _ in folds)
+    if min_graphs is None:
+        min_graphs = max(1, int(max_graphs / eta ** (nb_rounds - 1)))
+
+    rng = np.random.RandomState(42)
+    shuffled_folds = [(rng.permutation(train), validation) for train, validation in folds]
+
+    history = []
+    for round_index in range(nb_rounds):
+        nb_graphs = max_graphs if round_index == nb_rounds - 1 else min(max_graphs, min_graphs * eta ** round_index)
+        tasks = [(candidate, train[:nb_graphs], validation)
+                 for candidate in candidates for train, validation in shuffled_folds]
+
+        # Un fil XGBoost par tâche quand il y a assez de tâches pour occuper tous les cœurs
+        n_workers = min(n_cores, len(tasks))
+        n_threads = max(1, n_cores // n_workers)
+        scores = Parallel(n_jobs=n_workers)(
+            delayed(evaluate)(candidate, X, y, graph_rows, train, validation, edge_lists, n_threads)
+            for candidate, train, validation in tasks)
+
+        mean_scores = np.array(scores).reshape(len(candidates), len(folds)).mean(axis=1)
+        history.append({'graphs': nb_graphs, 'candidates': candidates, 'scores': mean_scores.tolist()})
+        print("Tour {0} : {1} candidats, {2} graphes d'entraînement, meilleur score {3:.2f}".format(
+            round_index + 1, len(candidates), nb_graphs, mean_scores.min()))
+
+        order = np.argsort(mean_scores, kind='stable')
+        candidates = [candidates[i] for i in order[:max(1, len(candidates) // eta)]]
+
+    best_params = candidates[0]
+    best_model = XGBClassifier(random_state=42, n_jobs=n_cores, **best_params)
+    best_model.fit(X, y)
+
+    return best_model, history
+
+
+@profiler.profiled()
 def train_edge_models_grid(X_graph, Y_tree):
     """
     Entraîne un modèle de classification (XGBoost) en utilisant la recherche d'hyperparamètres.
@@ -115,62 +410,17 @@ def train_edge_models_grid(X_graph, Y_tree):
     :param Y_tree: Liste des arbres optimaux correspondants.
     :return: Le modèle entraîné.
     """
-    graph_features_dicts = []
-
-    # Pré-calcule les caractéristiques globales pour chaque graphe
-    for graph in X_graph:
-        global_features_dict = calculate_global_graph_features(graph)
-        graph_features_dicts.append(global_features_dict)
-
-    # Créez un DataFrame pour stocker les caractéristiques et les étiquettes
-    import pandas as pd
-    df = pd.DataFrame(columns=["features", "label"])
-
-    # Construisez le DataFrame en utilisant les caractéristiques et les étiquettes
-    # Créez une liste pour stocker les données
-    data_list = []
-
-    # Construisez la liste de données en utilisant les caractéristiques et les étiquettes
-    for graph, optimal_tree, global_features_dict in zip(X_graph, Y_tree, graph_features_dicts):
-        print("New Graph")
-        for edge in graph.edges():
-            features = edge_to_features(graph, edge, global_features_dict)
-            data_list.append({"features": features, "label": 1 if edge in optimal_tree.edges() else 0})
-
-    # Créez le DataFrame une seule fois après la boucle
-    df = pd.DataFrame(data_list)
-    # Divisez le DataFrame en caractéristiques (X) et étiquettes (y)
-    X = np.array(df["features"].tolist())
-    y = np.array(df["label"].tolist())
-
-    # Définissez les hyperparamètres que vous souhaitez rechercher
-    param_grid = {
-        'n_estimators': [90, 100, 110],
-        'learning_rate': [0.1, 0.15],
-        'max_depth': [4, 5, 6],
-        'min_child_weight': [2, 3, 4],
-        'subsample': [1.0],
-        'colsample_bytree': [1.0],
-        'gamma': [0.1, 0.2, 0.3],
-        # Ajoutez d'autres hyperparamètres à rechercher
-    }
-
-    # Initialisez le classificateur XGBoost
-    xgb = XGBClassifier(random_state=42)
-
-    # Utilisez la recherche en grille pour trouver les meilleurs hyperparamètres
-    grid_search = GridSearchCV(xgb, param_grid, cv=5, scoring='accuracy')
-    grid_search.fit(X, y)
-
-    # Obtenez le modèle avec les meilleurs hyperparamètres
-    best_model = grid_search.best_estimator_
+    X, y, groups, edge_lists = build_feature_matrix(X_graph, Y_tree)
+    best_model, history = tune_edge_models(X, y, groups, edge_lists)
 
     # Affichez les meilleurs hyperparamètres
+    last_round = history[-1]
     print("Meilleurs hyperparamètres:")
-    print(grid_search.best_params_)
+    print(last_round['candidates'][int(np.argmin(last_round['scores']))])
 
     return best_model
 
+@profiler.profiled()
 def predict_proba_for_new_graph(graph, edge_models):
     """
     Prédit les probabilités d'inclusion des arêtes dans un arbre optimal pour un nouveau graphe.
@@ -179,16 +429,28 @@ def predict_proba_for_new_graph(graph, edge_models):
     :param edge_models: Le modèle de classification entraîné.
     :return: Un dictionnaire des probabilités pour chaque arête du graphe.
     """
-    probas = {}
     global_features_dict = calculate_global_graph_features(graph)
-    for edge in graph.edges():
-        features = edge_to_features(graph, edge, global_features_dict)
-        proba = edge_models.predict_proba(np.array(features).reshape(1, -1))
-        probas[edge] = float(proba[:, 1])
+    edges = list(graph.edges())
+    with profiler.section('ml.predict_proba_for_new_graph.features'):
+        features = edges_to_feature_matrix(graph, edges, global_features_dict)
+    with profiler.section('ml.predict_proba_for_new_graph.predict'):
+        probas = edge_models.predict_proba(features)[:, 1]
+    profiler.count('ml.predict_proba_for_new_graph.edges', len(edges))
+
+    return dict(zip(edges, probas.tolist()))
 
-    return probas
+
+def count_branch_vertices(tree):
+    """
+    Compte les sommets de branchement (degré supérieur ou égal à trois) d'un arbre.
+
+    :param tree: L'arbre couvrant.
+    :return: Le nombre de sommets de branchement, c'est-à-dire le score MBVST.
+    """
+    return sum(1 for node, degree in tree.degree() if degree >= 3)
 
 
+@profiler.profiled()
 def build_minimum_degree_spanning_tree(probabilities):
     """
     Construit un arbre couvrant de degré minimum en utilisant les probabilités d'inclusion des arêtes.
@@ -201,18 +463,13 @@ def build_minimum_degree_spanning_tree(probabilities):
 
     # Initialisez un ensemble vide pour représenter l'arbre couvrant
     min_degree_spanning_tree = nx.Graph()
+    components = nx.utils.UnionFind()
 
-    # Parcourez les arêtes triées et ajoutez-les à l'ensemble si elles ne créent pas de cycle
+    # Parcourez les arêtes triées et ajoutez-les à l'ensemble si elles ne créent pas de cycle,
+    # c'est-à-dire si leurs extrémités sont dans deux composantes différentes
     for edge, proba in sorted_edges:
-        min_degree_spanning_tree.add_edge(*edge)
-
-        # Vérifiez s'il y a un cycle après l'ajout de l'arête
-        try:
-            # find_cycle renverra une exception si aucun cycle n'est trouvé
-            nx.find_cycle(min_degree_spanning_tree, orientation='ignore')
-        except nx.NetworkXNoCycle:
-            continue
-        # Si l'arête crée un cycle, retirez-la
-        min_degree_spanning_tree.remove_edge(*edge)
+        if components[edge[0]] != components[edge[1]]:
+            components.union(edge[0], edge[1])
+            min_degree_spanning_tree.add_edge(*edge)
 
     return min_degree_spanning_tree
@@ -0,0 +1,256 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Variable d'environnement activant l'instrumentation, sa valeur est le chemin du fichier de trace
+ENV_VAR = 'MBVST_PROFILE'
+DEFAULT_TRACE_PATH = 'profile_trace.json'
+
+_enabled = bool(os.environ.get(ENV_VAR))
+_trace_path = os.environ.get(ENV_VAR) or DEFAULT_TRACE_PATH
+_events = []
+_counters = {}
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+
+def enable(trace_path=None):
+    """
+    Active l'instrumentation.
+
+    :param trace_path: Chemin du fichier de trace utilisé par dump() (optionnel).
+    :return: None
+    """
+    global _enabled, _trace_path
+    _enabled = True
+    if trace_path is not None:
+        _trace_path = trace_path
+
+
+def disable():
+    """
+    Désactive l'instrumentation, les événements déjà enregistrés sont conservés.
+
+    :return: None
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """
+    Indique si l'instrumentation est active.
+
+    :return: True si les événements sont enregistrés.
+    """
+    return _enabled
+
+
+def reset():
+    """
+    Vide les événements et compteurs enregistrés.
+
+    :return: None
+    """
+    global _origin
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _origin = time.perf_counter()
+
+
+def _timestamp(instant=None):
+    """
+    Convertit un instant perf_counter en microsecondes depuis l'origine de la trace.
+    """
+    if instant is None:
+        instant = time.perf_counter()
+    return (instant - _origin) * 1e6
+
+
+def _add_event(event):
+    event.setdefault('pid', os.getpid())
+    event.setdefault('tid', threading.get_ident())
+    with _lock:
+        _events.append(event)
+
+
+@contextmanager
+def section(name, **args):
+    """
+    Chronomètre le bloc de code englobé et l'enregistre comme une phase de la trace.
+
+    :param name: Nom de la phase (ex : 'solvepl.pl_flot.build').
+    :param args: Informations complémentaires attachées à l'événement.
+    :return: Un gestionnaire de contexte.
+    """
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _add_event({'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                    'ts': _timestamp(start), 'dur': (end - start) * 1e6, 'args': args})
+
+
+def profiled(name=None):
+    """
+    Décorateur chronométrant chaque appel d'une fonction.
+
+    :param name: Nom de la phase, par défaut 'module.fonction'.
+    :return: Le décorateur.
+    """
+    def decorator(func):
+        section_name = name or '{0}.{1}'.format(func.__module__, func.__name__)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with section(section_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Incrémente un compteur.
+
+    :param name: Nom du compteur.
+    :param value: Valeur à ajouter.
+    :return: None
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def record(name, **args):
+    """
+    Enregistre un événement ponctuel (taille de modèle, statut du solveur, ...).
+
+    :param name: Nom de l'événement.
+    :param args: Valeurs à enregistrer.
+    :return: None
+    """
+    if not _enabled:
+        return
+    _add_event({'name': name, 'cat': name.split('.')[0], 'ph': 'i', 's': 't',
+                'ts': _timestamp(), 'args': args})
+
+
+def record_series(name, points, start=None):
+    """
+    Enregistre une série temporelle (ex : trajectoire des solutions entières du solveur).
+
+    :param name: Nom de la série.
+    :param points: Liste de couples (secondes depuis start, valeur).
+    :param start: Instant perf_counter de référence, par défaut l'instant présent.
+    :return: None
+    """
+    if not _enabled:
+        return
+    if start is None:
+        start = time.perf_counter()
+    for seconds, value in points:
+        _add_event({'name': name, 'cat': name.split('.')[0], 'ph': 'C',
+                    'ts': _timestamp(start + seconds), 'args': {'value': value}})
+
+
+def get_trace():
+    """
+    Retourne la trace courante au format Chrome trace (chrome://tracing, Perfetto).
+
+    :return: Un dictionnaire sérialisable en JSON.
+    """
+    with _lock:
+        return {'traceEvents': list(_events),
+                'displayTimeUnit': 'ms',
+                'otherData': {'counters': dict(_counters), 'argv': sys.argv}}
+
+
+def dump(trace_path=None):
+    """
+    Écrit la trace courante dans un fichier JSON.
+
+    :param trace_path: Chemin du fichier, par défaut celui donné à enable() ou par MBVST_PROFILE.
+    :return: Le chemin du fichier écrit.
+    """
+    path = trace_path or _trace_path
+    with open(path, 'w') as file:
+        json.dump(get_trace(), file)
+    return path
+
+
+def summarize(trace):
+    """
+    Agrège une trace par phase.
+
+    :param trace: Une trace au format retourné par get_trace().
+    :return: Un dictionnaire {phase: {'count': n, 'total': secondes, 'max': secondes}}.
+    """
+    summary = {}
+    for event in trace['traceEvents']:
+        if event['ph'] != 'X':
+            continue
+        entry = summary.setdefault(event['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+        seconds = event['dur'] / 1e6
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+    return summary
+
+
+def aggregate(trace_paths):
+    """
+    Agrège plusieurs fichiers de trace (ex : un par graphe d'un benchmark).
+
+    :param trace_paths: Liste de chemins de fichiers de trace.
+    :return: Un couple (résumé par phase, compteurs cumulés).
+    """
+    summary = {}
+    counters = {}
+    for path in trace_paths:
+        with open(path, 'r') as file:
+            trace = json.load(file)
+        for name, entry in summarize(trace).items():
+            total = summary.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            total['count'] += entry['count']
+            total['total'] += entry['total']
+            total['max'] = max(total['max'], entry['max'])
+        for name, value in trace.get('otherData', {}).get('counters', {}).items():
+            counters[name] = counters.get(name, 0) + value
+    return summary, counters
+
+
+def main():
+    """
+    Affiche au format CSV l'agrégation des fichiers de trace donnés en argument.
+    """
+    if len(sys.argv) < 2:
+        print("Veuillez fournir au moins un fichier de trace en argument d'exécution.")
+        return 1
+
+    summary, counters = aggregate(sys.argv[1:])
+    print('Phase,Appels,Temps total,Temps max')
+    for name, entry in sorted(summary.items(), key=lambda item: item[1]['total'], reverse=True):
+        print('{0},{1},{2:.3f},{3:.3f}'.format(name, entry['count'], entry['total'], entry['max']))
+    for name, value in sorted(counters.items()):
+        print('{0},{1},,'.format(name, value))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,382 @@
+import argparse
+import csv
+import math
+import os
+import re
+import sys
+import time
+import joblib
+import networkx as nx
+import numpy as np
+from xgboost import XGBRegressor
+import cycles
+import ml
+import profiler
+import solution_cache
+import solvepl
+from graph_io import read_graph_from_file
+
+# Méthodes disponibles, dans l'ordre utilisé pour l'encodage
+METHODS = ['flot', 'multi_flot', 'martin', 'cycles', 'xgboost', 'adaboost']
+
+# Correspondance entre les noms de colonnes des fichiers bench_*.csv et les méthodes
+CSV_METHODS = {'Flot': 'flot', 'MultiFlot': 'multi_flot', 'Martin': 'martin', 'Cycle': 'cycles',
+               'Xgboost': 'xgboost', 'Adaboost': 'adaboost'}
+
+BENCH_FILES = ['bench_low_pl.csv', 'bench_low.csv', 'bench_big_flot.csv', 'bench_big_ML.csv']
+# Dossier des graphes des benchmarks, nécessaire pour calculer toutes les statistiques
+GRAPH_DIR = 'instances/Spd_Inst_Rid_Final2'
+RUNS_FILE = 'bench_runs.csv'
+RUNS_FIELDNAMES = ['Nom du graphe', 'Methode', 'Score', 'Temps', 'Limite']
+
+# Limite de temps des benchmarks existants, utilisée pour les exécutions notées -1
+DEFAULT_TIME_LIMIT = 120
+# Écart attribué à une exécution qui n'a pas trouvé d'arbre
+FAILED_GAP = 1.0
+
+
+def graph_statistics(graph):
+    """
+    Calcule des statistiques peu coûteuses d'un graphe.
+
+    :param graph: Le graphe.
+    :return: Une liste [n, m, densité, dimension de l'espace des cycles, sommets du 2-cœur].
+    """
+    nb_nodes = graph.number_of_nodes()
+    nb_edges = graph.number_of_edges()
+    # Le 2-cœur est le graphe réduit obtenu en retirant récursivement les sommets de degré 1
+    core_nodes = nx.k_core(graph, 2).number_of_nodes()
+    return [nb_nodes, nb_edges, nx.density(graph),
+            nb_edges - nb_nodes + nx.number_connected_components(graph), core_nodes]
+
+
+def statistics_from_name(graph_name):
+    """
+    Calcule les statistiques d'un graphe à partir de son nom Spd_RF2_n_m_id, sans le lire.
+
+    La taille du 2-cœur n'est pas connue et vaut NaN (valeur manquante gérée par XGBoost). À n'utiliser que
+    pour les graphes absents du disque : un sélecteur entraîné uniquement sur ces statistiques ignore le 2-cœur.
+
+    :param graph_name: Le nom du fichier du graphe.
+    :return: Une liste au même format que graph_statistics, ou None si le nom ne suit pas la convention.
+    """
+    match = re.search(r'_(\d+)_(\d+)_\d+\.txt$', graph_name)
+    if not match:
+        return None
+    nb_nodes, nb_edges = int(match.group(1)), int(match.group(2))
+    density = 2 * nb_edges / (nb_nodes * (nb_nodes - 1))
+    return [nb_nodes, nb_edges, density, nb_edges - nb_nodes + 1, math.nan]
+
+
+def read_bench_runs(csv_paths=BENCH_FILES, runs_path=RUNS_FILE, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Lit les exécutions enregistrées dans les fichiers de benchmark.
+
+    Les fichiers bench_*.csv ont une colonne Score et Temps par méthode, -1 signifiant qu'aucun arbre
+    n'a été trouvé dans la limite de temps et une case vide que la méthode n'a pas été mesurée. Le fichier des
+    nouvelles exécutions a une ligne par exécution, un temps négatif y est remplacé par sa limite de temps.
+
+    :param csv_paths: Les fichiers bench_*.csv.
+    :param runs_path: Le fichier des nouvelles exécutions (voir record_run).
+    :param time_limit: La limite de temps attribuée aux exécutions notées -1.
+    :return: Une liste de dictionnaires {'graph', 'method', 'score' (None si échec), 'time'}.
+    """
+    runs = []
+    for csv_path in csv_paths:
+        if not os.path.isfile(csv_path):
+            continue
+        with open(csv_path, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                for label, method in CSV_METHODS.items():
+                    if not row.get('Score ' + label):
+                        continue
+                    score = float(row['Score ' + label])
+                    seconds = float(row['Temps ' + label])
+                    runs.append({'graph': row['Nom du graphe'], 'method': method,
+                                 'score': score if score >= 0 else None,
+                                 'time': seconds if seconds >= 0 else time_limit})
+
+    if os.path.isfile(runs_path):
+        with open(runs_path, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                score = float(row['Score'])
+                seconds = float(row['Temps'])
+                runs.append({'graph': row['Nom du graphe'], 'method': row['Methode'],
+                             'score': score if score >= 0 else None,
+                             'time': seconds if seconds >= 0 else float(row['Limite'])})
+
+    return runs
+
+
+def record_run(graph_name, method, score, seconds, time_limit, runs_path=RUNS_FILE):
+    """
+    Ajoute une exécution au fichier des nouvelles exécutions, pour enrichir l'entraînement du sélecteur.
+
+    :param graph_name: Le nom du fichier du graphe.
+    :param method: La méthode utilisée.
+    :param score: Le score obtenu, -1 si aucun arbre n'a été trouvé.
+    :param seconds: Le temps de résolution.
+    :param time_limit: La limite de temps donnée à la méthode.
+    :param runs_path: Le fichier des nouvelles exécutions.
+    :return: None
+    """
+    write_header = not os.path.isfile(runs_path)
+    with open(runs_path, 'a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RUNS_FIELDNAMES)
+        if write_header:
+            writer.writeheader()
+        writer.writerow({'Nom du graphe': graph_name, 'Methode': method, 'Score': score,
+                         'Temps': round(seconds, 2), 'Limite': time_limit})
+
+
+def method_features(statistics, method):
+    """
+    Concatène les statistiques d'un graphe et l'encodage one-hot d'une méthode.
+
+    :param statistics: Les statistiques du graphe.
+    :param method: La méthode.
+    :return: Le vecteur de caractéristiques.
+    """
+    return list(statistics) + [1.0 if method == other else 0.0 for other in METHODS]
+
+
+@profiler.profiled()
+def train_selector(runs, graph_dir=GRAPH_DIR):
+    """
+    Entraîne les modèles prédisant le temps et l'écart au meilleur score connu de chaque méthode.
+
+    L'écart d'une exécution est relatif au meilleur score obtenu sur le même graphe par toutes les méthodes.
+
+    :param runs: Les exécutions (voir read_bench_runs).
+    :param graph_dir: Dossier des graphes, les statistiques des graphes absents sont déduites de leur nom
+                      et la taille de leur 2-cœur est inconnue.
+    :return: Le sélecteur, un dictionnaire {'time': modèle, 'gap': modèle, 'methods': méthodes vues}.
+    """
+    best_scores = {}
+    for run in runs:
+        if run['score'] is not None:
+            best_scores[run['graph']] = min(best_scores.get(run['graph'], math.inf), run['score'])
+
+    statistics_cache = {}
+    missing_graphs = 0
+    X_features = []
+    Y_time = []
+    Y_gap = []
+    for run in runs:
+        name = run['graph']
+        if name not in statistics_cache:
+            path = os.path.join(graph_dir, name)
+            if os.path.isfile(path):
+                statistics_cache[name] = graph_statistics(read_graph_from_file(path))
+            else:
+                statistics_cache[name] = statistics_from_name(name)
+                missing_graphs += 1
+        if statistics_cache[name] is None:
+            continue
+
+        if run['score'] is None:
+            gap = FAILED_GAP
+        else:
+            gap = (run['score'] - best_scores[name]) / max(best_scores[name], 1)
+
+        X_features.append(method_features(statistics_cache[name], run['method']))
+        Y_time.append(math.log1p(run['time']))
+        Y_gap.append(gap)
+
+    if missing_graphs:
+        print(f"Attention : {missing_graphs} graphes absents de {graph_dir}, la taille de leur 2-cœur est inconnue.")
+
+    X = np.array(X_features, dtype=float)
+    time_model = XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=4, random_state=42)
+    time_model.fit(X, np.array(Y_time))
+    gap_model = XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=4, random_state=42)
+    gap_model.fit(X, np.array(Y_gap))
+
+    return {'time': time_model, 'gap': gap_model, 'methods': sorted({run['method'] for run in runs})}
+
+
+def predict_methods(selector, statistics):
+    """
+    Prédit le temps et l'écart de chaque méthode sur un graphe.
+
+    :param selector: Le sélecteur entraîné.
+    :param statistics: Les statistiques du graphe.
+    :return: Un dictionnaire {méthode: (temps en secondes, écart)}.
+    """
+    methods = selector['methods']
+    X = np.array([method_features(statistics, method) for method in methods], dtype=float)
+    times = np.expm1(selector['time'].predict(X))
+    gaps = selector['gap'].predict(X)
+    return {method: (float(seconds), float(gap)) for method, seconds, gap in zip(methods, times, gaps)}
+
+
+def choose_method(selector, statistics, time_budget, methods=None):
+    """
+    Choisit la méthode donnant le meilleur score prévu dans le budget de temps.
+
+    Parmi les méthodes dont le temps prévu tient dans le budget, la méthode d'écart prévu minimal est
+    choisie (la plus rapide en cas d'égalité). Si aucune ne tient dans le budget, la plus rapide est choisie.
+
+    :param selector: Le sélecteur entraîné.
+    :param statistics: Les statistiques du graphe.
+    :param time_budget: Le budget de temps en secondes.
+    :param methods: Les méthodes autorisées (optionnel, toutes par défaut).
+    :return: Un couple (méthode choisie, prédictions de predict_methods).
+    """
+    predictions = predict_methods(selector, statistics)
+    if methods is not None:
+        predictions = {method: value for method, value in predictions.items() if method in methods}
+
+    in_budget = [method for method, (seconds, gap) in predictions.items() if seconds <= time_budget]
+    if in_budget:
+        method = min(in_budget, key=lambda m: (round(predictions[m][1], 3), predictions[m][0]))
+    else:
+        method = min(predictions, key=lambda m: predictions[m][0])
+    return method, predictions
+
+
+def tree_from_solution(graph, x):
+    """
+    Construit l'arbre à partir des variables de décision des arêtes d'un programme linéaire.
+
+    :param graph: Le graphe d'origine.
+    :param x: Le dictionnaire des variables des arêtes (orientées ou non).
+    :return: L'arbre obtenu.
+    """
+    tree = nx.Graph()
+    tree.add_nodes_from(graph.nodes())
+    for edge, var in x.items():
+        value = var.value()
+        if value is not None and 0.8 <= value <= 1.2:  # Gestion de la précision numérique
+            tree.add_edge(edge[0], edge[1])
+    return tree
+
+
+def solve_with_method(graph, method, time_limit, path_to_cplex, edge_models_by_method=None, warm_start=None):
+    """
+    Résout le problème MBVST avec une méthode donnée.
+
+    :param graph: Le graphe.
+    :param method: La méthode (voir METHODS).
+    :param time_limit: Limite de temps pour les méthodes de programmation linéaire.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param edge_models_by_method: Les modèles de classification {'xgboost': modèle, 'adaboost': modèle} (optionnel,
+                                  un modèle absent est chargé depuis edge_models_<méthode>.joblib).
+    :param warm_start: Un couple (arbre, score) connu, donné comme solution initiale et borne aux méthodes
+                       de programmation linéaire (optionnel, ignoré par les autres méthodes).
+    :return: Un couple (arbre, score), le score vaut -1 si aucun arbre couvrant n'a été trouvé.
+    """
+    if method == 'flot':
+        x, _ = solvepl.pl_flot(graph.to_directed(), time_limit, path_to_cplex, warm_start)
+        tree = tree_from_solution(graph, x)
+    elif method == 'multi_flot':
+        x, _ = solvepl.pl_flot_multi(graph.to_directed(), time_limit, path_to_cplex, warm_start)
+        tree = tree_from_solution(graph, x)
+    elif method == 'martin':
+        x, _ = solvepl.pl_martin2(graph, time_limit, path_to_cplex, warm_start)
+        tree = tree_from_solution(graph, x)
+    elif method == 'cycles':
+        x, _, _ = cycles.solve_by_cycles(graph, time_limit, path_to_cplex)
+        tree = tree_from_solution(graph, x)
+    elif method in ('xgboost', 'adaboost'):
+        edge_models = (edge_models_by_method or {}).get(method)
+        if edge_models is None:
+            edge_models = joblib.load('edge_models_{0}.joblib'.format(method))
+        predictions = ml.predict_proba_for_new_graph(graph, edge_models)
+        tree = ml.build_minimum_degree_spanning_tree(predictions)
+        tree.add_nodes_from(graph.nodes())
+    else:
+        raise ValueError("Méthode inconnue : {0}".format(method))
+
+    if not nx.is_tree(tree):
+        return tree, -1
+    return tree, ml.count_branch_vertices(tree)
+
+
+def solve_with_cache(graph, method, time_limit, path_to_cplex, edge_models_by_method=None,
+                     cache_dir=solution_cache.DEFAULT_CACHE_DIR):
+    """
+    Résout le problème MBVST avec une méthode donnée en passant par le cache des arbres résolus.
+
+    :param graph: Le graphe.
+    :param method: La méthode (voir METHODS).
+    :param time_limit: Limite de temps pour les méthodes de programmation linéaire.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param edge_models_by_method: Les modèles de classification par méthode (optionnel, voir solve_with_method).
+    :param cache_dir: Le dossier du cache, None pour ne pas l'utiliser.
+    :return: Un couple (arbre, score), le score vaut -1 si aucun arbre couvrant n'a été trouvé.
+    """
+    if cache_dir is None:
+        return solve_with_method(graph, method, time_limit, path_to_cplex, edge_models_by_method)
+
+    return solution_cache.cached_solve(
+        graph, method,
+        lambda warm_start: solve_with_method(graph, method, time_limit, path_to_cplex, edge_models_by_method,
+                                             warm_start),
+        cache_dir)
+
+
+@profiler.profiled()
+def solve_auto(graph, time_budget, path_to_cplex, selector, edge_models_by_method=None, graph_name=None,
+               runs_path=RUNS_FILE, cache_dir=solution_cache.DEFAULT_CACHE_DIR):
+    """
+    Résout le problème MBVST avec la méthode prévue comme la meilleure dans le budget de temps.
+
+    :param graph: Le graphe.
+    :param time_budget: Le budget de temps en secondes.
+    :param path_to_cplex: Chemin vers CPLEX.
+    :param selector: Le sélecteur entraîné.
+    :param edge_models_by_method: Les modèles de classification par méthode (optionnel, voir solve_with_method).
+    :param graph_name: Nom du graphe, l'exécution est ajoutée au fichier des nouvelles exécutions s'il est donné.
+    :param runs_path: Le fichier des nouvelles exécutions.
+    :param cache_dir: Le dossier du cache des arbres résolus, None pour ne pas l'utiliser.
+    :return: Un triplet (arbre, score, méthode utilisée).
+    """
+    method, predictions = choose_method(selector, graph_statistics(graph), time_budget)
+    profiler.record('selection.solve_auto.choice', method=method,
+                    predicted_time=predictions[method][0], predicted_gap=predictions[method][1])
+
+    start_time = time.time()
+    tree, score = solve_with_cache(graph, method, time_budget, path_to_cplex, edge_models_by_method, cache_dir)
+    # Une réponse du cache ne dit rien du temps de la méthode, elle n'est pas enregistrée
+    from_cache = cache_dir is not None and solution_cache.last_cache_hit
+    if graph_name is not None and not from_cache:
+        record_run(graph_name, method, score, time.time() - start_time, time_budget, runs_path)
+
+    return tree, score, method
+
+
+def main():
+    """
+    Entraîne le sélecteur ou affiche la méthode choisie pour un graphe.
+    """
+    parser = argparse.ArgumentParser(description="Sélection automatique de la méthode de résolution.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Entraîne le sélecteur sur les fichiers de benchmark.")
+    train_parser.add_argument('--output', default='selector.joblib', help="Fichier du sélecteur.")
+    train_parser.add_argument('--graph-dir', default=GRAPH_DIR, help="Dossier des graphes des benchmarks.")
+
+    choose_parser = subparsers.add_parser('choose', help="Affiche les prédictions et la méthode choisie.")
+    choose_parser.add_argument('graph', help="Chemin du graphe.")
+    choose_parser.add_argument('budget', type=float, help="Budget de temps en secondes.")
+    choose_parser.add_argument('--selector', default='selector.joblib', help="Fichier du sélecteur.")
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        runs = read_bench_runs()
+        selector = train_selector(runs, args.graph_dir)
+        joblib.dump(selector, args.output)
+        print(f"Sélecteur entraîné sur {len(runs)} exécutions et enregistré dans {args.output}.")
+        return 0
+
+    selector = joblib.load(args.selector)
+    method, predictions = choose_method(selector, graph_statistics(read_graph_from_file(args.graph)), args.budget)
+    for name, (seconds, gap) in sorted(predictions.items(), key=lambda item: item[1][0]):
+        print(f"{name} : temps prévu {seconds:.2f} s, écart prévu {gap:.3f}")
+    print("Méthode choisie :", method)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
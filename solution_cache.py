@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import networkx as nx
+import ml
+import profiler
+import solvepl
+from graph_io import read_graph_from_file
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_DIR = 'solution_cache'
+
+# Méthodes exactes : leur statut (optimal ou limite de temps) est lu dans solvepl.last_solve_info
+EXACT_METHODS = ('flot', 'multi_flot', 'martin')
+
+# Statuts de preuve d'une entrée : seuls les arbres optimaux sont renvoyés sans résolution
+STATUS_OPTIMAL = 'optimal'
+STATUS_TIME_LIMIT = 'time_limit'
+STATUS_HEURISTIC = 'heuristic'
+
+# Vrai si l'arbre renvoyé par le dernier appel à cached_solve vient du cache et non de la méthode demandée
+last_cache_hit = False
+
+# Fichiers de benchmark et colonnes des méthodes exactes, utilisés pour savoir si un arbre importé est optimal
+BENCH_FILES = ['bench_low_pl.csv', 'bench_low.csv']
+EXACT_CSV_LABELS = ('Flot', 'MultiFlot', 'Martin')
+# Limite de temps des benchmarks existants
+BENCH_TIME_LIMIT = 120
+
+
+def graph_hash(graph):
+    """
+    Calcule l'empreinte canonique d'un graphe à partir de son nombre de sommets et de sa liste d'arêtes triée.
+
+    Deux graphes de mêmes sommets et mêmes arêtes ont la même empreinte, quel que soit l'ordre ou le sens des arêtes.
+
+    :param graph: Le graphe.
+    :return: L'empreinte SHA-256 en hexadécimal.
+    """
+    edges = sorted((min(e), max(e)) for e in graph.edges())
+    digest = hashlib.sha256('{0}\n'.format(graph.number_of_nodes()).encode())
+    digest.update(''.join('{0} {1}\n'.format(u, v) for u, v in edges).encode())
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+@contextlib.contextmanager
+def _entry_lock(key, cache_dir):
+    """
+    Verrou exclusif sur l'entrée d'un graphe, partagé entre les processus utilisant le même cache.
+    """
+    path = os.path.join(cache_dir, key[:2], key + '.lock')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            # msvcrt.locking abandonne après 10 secondes, on réessaie jusqu'à obtenir le verrou
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def load_entry(graph, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Retourne l'entrée du cache d'un graphe.
+
+    :param graph: Le graphe.
+    :param cache_dir: Le dossier du cache.
+    :return: Un dictionnaire {'tree', 'score', 'method', 'status', 'gap', 'time', ...} ou None si le graphe est absent.
+    """
+    path = _entry_path(graph_hash(graph), cache_dir)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def entry_tree(entry, graph):
+    """
+    Reconstruit l'arbre d'une entrée du cache.
+
+    :param entry: L'entrée du cache.
+    :param graph: Le graphe de l'entrée.
+    :return: L'arbre couvrant.
+    """
+    tree = nx.Graph()
+    tree.add_nodes_from(graph.nodes())
+    tree.add_edges_from(tuple(edge) for edge in entry['tree'])
+    return tree
+
+
+def store_entry(graph, tree, score, method, status, gap=None, seconds=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Enregistre un arbre dans le cache s'il améliore l'entrée existante.
+
+    Une entrée optimale n'est jamais remplacée. Sinon, l'arbre remplace l'entrée s'il est optimal ou de meilleur score.
+    La comparaison et l'écriture sont faites sous un verrou propre au graphe et l'écriture est atomique :
+    plusieurs processus peuvent partager le même cache.
+
+    :param graph: Le graphe.
+    :param tree: L'arbre couvrant obtenu.
+    :param score: Le score de l'arbre.
+    :param method: La méthode ayant produit l'arbre.
+    :param status: Le statut de preuve (STATUS_OPTIMAL, STATUS_TIME_LIMIT ou STATUS_HEURISTIC).
+    :param gap: L'écart relatif à la borne du solveur pour une résolution interrompue (optionnel).
+    :param seconds: Le temps de résolution (optionnel).
+    :param cache_dir: Le dossier du cache.
+    :return: True si l'entrée a été écrite.
+    """
+    key = graph_hash(graph)
+    entry = {'hash': key,
+             'nodes': graph.number_of_nodes(),
+             'edges': graph.number_of_edges(),
+             'tree': sorted([min(e), max(e)] for e in tree.edges()),
+             'score': score,
+             'method': method,
+             'status': status,
+             'gap': gap,
+             'time': seconds}
+
+    path = _entry_path(key, cache_dir)
+    with _entry_lock(key, cache_dir):
+        existing = load_entry(graph, cache_dir)
+        if existing is not None:
+            if existing['status'] == STATUS_OPTIMAL:
+                return False
+            if status != STATUS_OPTIMAL and score >= existing['score']:
+                return False
+
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+    return True
+
+
+@profiler.profiled()
+def cached_solve(graph, method, solve, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Résout un graphe en consultant d'abord le cache.
+
+    Un arbre optimal en cache est renvoyé immédiatement, quelle que soit la méthode qui l'a produit. Un arbre
+    non prouvé optimal n'est pas renvoyé tel quel : il est donné à la méthode comme solution initiale et borne,
+    et le meilleur des deux arbres est conservé. Dans les deux cas où l'arbre renvoyé vient du cache,
+    last_cache_hit est mis à vrai : le résultat ne doit pas être attribué à la méthode.
+
+    Le cache n'est donc pas adapté aux comparaisons de méthodes (main.py, benchmarks) : les solveurs de
+    solvepl et cycles ne le consultent pas, seuls selection.solve_with_cache et selection.solve_auto le font.
+
+    :param graph: Le graphe.
+    :param method: La méthode utilisée.
+    :param solve: Une fonction recevant warm_start (couple (arbre, score) ou None) et retournant un couple (arbre, score).
+    :param cache_dir: Le dossier du cache.
+    :return: Un couple (arbre, score).
+    """
+    global last_cache_hit
+    entry = load_entry(graph, cache_dir)
+    last_cache_hit = entry is not None and entry['status'] == STATUS_OPTIMAL
+    if last_cache_hit:
+        profiler.count('solution_cache.hits')
+        return entry_tree(entry, graph), entry['score']
+
+    profiler.count('solution_cache.misses')
+    warm_start = (entry_tree(entry, graph), entry['score']) if entry is not None else None
+
+    solvepl.last_solve_info.clear()
+    start_time = time.time()
+    tree, score = solve(warm_start)
+    seconds = time.time() - start_time
+
+    if method in EXACT_METHODS and solvepl.last_solve_info:
+        status = STATUS_OPTIMAL if solvepl.last_solve_info['optimal'] else STATUS_TIME_LIMIT
+        gap = solvepl.last_solve_info['gap']
+    else:
+        status = STATUS_HEURISTIC
+        gap = None
+
+    if score >= 0:
+        store_entry(graph, tree, score, method, status, gap, seconds, cache_dir)
+
+    if warm_start is not None and (score < 0 or warm_start[1] < score):
+        last_cache_hit = True
+        return warm_start
+    return tree, score
+
+
+def read_proven_scores(csv_paths=BENCH_FILES, time_limit=BENCH_TIME_LIMIT):
+    """
+    Lit dans les fichiers de benchmark les scores prouvés optimaux, obtenus par une méthode exacte avant sa limite de temps.
+
+    :param csv_paths: Les fichiers bench_*.csv, les fichiers absents sont ignorés.
+    :param time_limit: La limite de temps des benchmarks.
+    :return: Un dictionnaire {nom du graphe: score optimal}.
+    """
+    proven_scores = {}
+    for csv_path in csv_paths:
+        if not os.path.isfile(csv_path):
+            continue
+        with open(csv_path, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                for label in EXACT_CSV_LABELS:
+                    if not row.get('Score ' + label) or not row.get('Temps ' + label):
+                        continue
+                    score = float(row['Score ' + label])
+                    seconds = float(row['Temps ' + label])
+                    if score >= 0 and 0 <= seconds < time_limit:
+                        proven_scores[row['Nom du graphe']] = score
+    return proven_scores
+
+
+def import_solved_instances(solved_dir, graph_dir, cache_dir=DEFAULT_CACHE_DIR, status=STATUS_TIME_LIMIT,
+                            method='import', proven_scores=None):
+    """
+    Importe dans le cache les arbres résolus d'un dossier (ex : instances/Low_graph_solved).
+
+    Chaque arbre est associé au graphe de même nom dans graph_dir, les arbres sans graphe ou qui ne sont pas
+    des arbres couvrants de leur graphe sont ignorés. Certains arbres de ces dossiers ont été obtenus en limite
+    de temps : ils sont importés avec le statut donné, sauf ceux dont le score est prouvé optimal par proven_scores.
+
+    :param solved_dir: Le dossier des arbres résolus.
+    :param graph_dir: Le dossier des graphes d'origine.
+    :param cache_dir: Le dossier du cache.
+    :param status: Le statut de preuve des arbres importés.
+    :param method: La méthode enregistrée pour les arbres importés.
+    :param proven_scores: Les scores prouvés optimaux par graphe (voir read_proven_scores, optionnel).
+    :return: Un couple (nombre d'arbres importés, nombre d'arbres ignorés).
+    """
+    if proven_scores is None:
+        proven_scores = {}
+    imported = 0
+    skipped = 0
+    for filename in sorted(os.listdir(solved_dir)):
+        graph_path = os.path.join(graph_dir, filename)
+        if not filename.endswith('.txt') or not os.path.isfile(graph_path):
+            skipped += 1
+            continue
+
+        graph = read_graph_from_file(graph_path)
+        tree = read_graph_from_file(os.path.join(solved_dir, filename))
+        if not nx.is_tree(tree) or not all(graph.has_edge(u, v) for u, v in tree.edges()):
+            print(f"Arbre ignoré, ce n'est pas un arbre couvrant du graphe : {filename}")
+            skipped += 1
+            continue
+
+        score = ml.count_branch_vertices(tree)
+        tree_status = STATUS_OPTIMAL if filename in proven_scores and score <= proven_scores[filename] else status
+        if store_entry(graph, tree, score, method, tree_status, cache_dir=cache_dir):
+            imported += 1
+
+    return imported, skipped
+
+
+def main():
+    """
+    Importe des arbres résolus dans le cache ou affiche l'entrée d'un graphe.
+    """
+    parser = argparse.ArgumentParser(description="Cache des arbres résolus.")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Dossier du cache.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Importe un dossier d'arbres résolus.")
+    import_parser.add_argument('solved_dir', help="Dossier des arbres résolus (ex : instances/Low_graph_solved).")
+    import_parser.add_argument('graph_dir', help="Dossier des graphes d'origine (ex : instances/Spd_Inst_Rid_Final2).")
+    import_parser.add_argument('--status', default=STATUS_TIME_LIMIT,
+                               choices=[STATUS_OPTIMAL, STATUS_TIME_LIMIT, STATUS_HEURISTIC],
+                               help="Statut de preuve des arbres importés.")
+    import_parser.add_argument('--bench', nargs='*', default=BENCH_FILES,
+                               help="Fichiers de benchmark : un arbre dont le score a été atteint par une méthode "
+                                    "exacte avant la limite de temps est importé comme optimal.")
+    import_parser.add_argument('--bench-time-limit', type=float, default=BENCH_TIME_LIMIT,
+                               help="Limite de temps des fichiers de benchmark.")
+
+    show_parser = subparsers.add_parser('show', help="Affiche l'entrée du cache d'un graphe.")
+    show_parser.add_argument('graph', help="Chemin du graphe.")
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        proven_scores = read_proven_scores(args.bench, args.bench_time_limit)
+        imported, skipped = import_solved_instances(args.solved_dir, args.graph_dir, args.cache_dir, args.status,
+                                                    proven_scores=proven_scores)
+        print(f"{imported} arbres importés dans {args.cache_dir}, {skipped} ignorés.")
+        return 0
+
+    entry = load_entry(read_graph_from_file(args.graph), args.cache_dir)
+    if entry is None:
+        print("Graphe absent du cache.")
+        return 1
+    print(f"Score {entry['score']} ({entry['status']}, écart {entry['gap']}) obtenu par {entry['method']} "
+          f"en {entry['time']} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,15 @@
 import pulp as pl
 from itertools import chain, combinations
 import networkx as nx
+import re
+import time
+import profiler
+
+# Journal de CPLEX, à changer pour chaque processus lorsque plusieurs résolutions tournent en parallèle
+LOG_PATH = "info.log"
+
+# Statut de la dernière résolution, mis à jour par solve_model
+last_solve_info = {}
 
 
 def powerset(iterable):
@@ -46,6 +55,91 @@ def edges_containing_node(graph, node):
     return node_edges
 
 
+def read_cplex_log(log_path=LOG_PATH):
+    """
+    Lit le journal de CPLEX et en extrait la trajectoire des solutions entières et la borne finale.
+
+    @param log_path: Chemin du journal écrit par CPLEX.
+    @return: Un dictionnaire {'incumbents': [(secondes, valeur)], 'best_bound': borne ou None, 'gap': écart ou None}.
+    """
+    info = {'incumbents': [], 'best_bound': None, 'gap': None}
+    try:
+        with open(log_path, 'r') as file:
+            lines = file.readlines()
+    except OSError:
+        return info
+
+    for line in lines:
+        match = re.search(r'Found incumbent of value\s+(\S+)\s+after\s+(\S+)\s+sec', line)
+        if match:
+            info['incumbents'].append((float(match.group(2)), float(match.group(1))))
+            continue
+        match = re.search(r'Current MIP best bound\s*=\s*(\S+)\s+\(gap\s*=\s*\S+,\s*(\S+)%\)', line)
+        if match:
+            info['best_bound'] = float(match.group(1))
+            info['gap'] = float(match.group(2)) / 100
+
+    return info
+
+
+def solve_model(model, solver, name):
+    """
+    Résout un modèle en enregistrant sa taille, son temps de résolution et le statut du solveur.
+
+    @param model: Le modèle PuLP à résoudre.
+    @param solver: Le solveur PuLP.
+    @param name: Nom de la méthode utilisé dans la trace (ex : 'solvepl.pl_flot').
+    @return: None, le statut de la résolution est conservé dans last_solve_info.
+    """
+    profiler.record(name + '.model', variables=model.numVariables(), constraints=model.numConstraints())
+    profiler.count(name + '.solves')
+
+    # CPLEX ajoute à la fin d'un journal existant : il est vidé pour ne lire que cette résolution
+    open(LOG_PATH, 'w').close()
+
+    start = time.perf_counter()
+    # L'écriture du fichier LP, l'appel à CPLEX et la lecture de la solution sont faits par PuLP
+    with profiler.section(name + '.solve'):
+        model.solve(solver)
+
+    log_info = read_cplex_log(LOG_PATH)
+    last_solve_info.clear()
+    last_solve_info.update({'status': pl.LpStatus[model.status],
+                            'optimal': model.sol_status == pl.LpSolutionOptimal,
+                            'objective': pl.value(model.objective),
+                            'best_bound': log_info['best_bound'],
+                            'gap': log_info['gap'],
+                            'time': time.perf_counter() - start})
+
+    profiler.record(name + '.status', status=last_solve_info['status'], objective=last_solve_info['objective'],
+                    best_bound=log_info['best_bound'], gap=log_info['gap'])
+    profiler.record_series(name + '.incumbent', log_info['incumbents'], start)
+
+
+def set_warm_start(model, graph, x, tree, score):
+    """
+    Donne un arbre connu comme solution initiale au solveur et borne l'objectif par son score.
+
+    @param model: Le modèle PuLP.
+    @param graph: Le graphe du modèle (orienté ou non).
+    @param x: Les variables de décision des arêtes.
+    @param tree: L'arbre couvrant connu.
+    @param score: Le score de l'arbre.
+    @return: None
+    """
+    if graph.is_directed():
+        # Les modèles de flot cherchent une arborescence issue du sommet source 1
+        arcs = set(nx.bfs_edges(tree, 1))
+        for e, var in x.items():
+            var.setInitialValue(1 if e in arcs else 0)
+    else:
+        for e, var in x.items():
+            var.setInitialValue(1 if tree.has_edge(e[0], e[1]) else 0)
+
+    model += model.objective <= score, "borne_arbre_connu"
+
+
+@profiler.profiled()
 def pl_expo(graph, time_limit, path_to_cplex):
     """
     Résout le problème d'optimisation MBVST avec un nombre exponentielle de contraintes.
@@ -55,268 +149,325 @@ def pl_expo(graph, time_limit, path_to_cplex):
     @param path_to_cplex: Chemin vers CPLEX.
     @return: Les variables de décision obtenues (x, y).
     """
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=LOG_PATH, msg=False)
     model = pl.LpProblem("main_problem", pl.LpMinimize)
 
-    # Nombre de sommet
-    nb_nodes = graph.number_of_nodes()
+    with profiler.section('solvepl.pl_expo.build'):
+        # Nombre de sommet
+        nb_nodes = graph.number_of_nodes()
 
-    all_subsets = list(powerset(list(range(1, nb_nodes + 1))))
-    all_subsets = all_subsets[nb_nodes + 1:]
-    print(all_subsets)
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
-    y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+        all_subsets = list(powerset(list(range(1, nb_nodes + 1))))
+        all_subsets = all_subsets[nb_nodes + 1:]
+        print(all_subsets)
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
+        y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
 
-    # Création de la fonction objective
-    model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
+        # Création de la fonction objective
+        model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
 
-    # Création des contraintes
-    # Contrainte (3)
-    model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
+        # Création des contraintes
+        # Contrainte (3)
+        model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
 
-    # Contrainte (4)
-    for S in all_subsets:
-        model += pl.lpSum(x[e] for e in edges_in_subset(graph, S)) <= len(S) - 1
+        # Contrainte (4)
+        for S in all_subsets:
+            model += pl.lpSum(x[e] for e in edges_in_subset(graph, S)) <= len(S) - 1
 
-    # Contrainte (5)
-    for v in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in edges_containing_node(graph, v)) - 2 <= graph.degree[v] * y[v]
-        model.solve(solver)
+        # Contrainte (5)
+        for v in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in edges_containing_node(graph, v)) - 2 <= graph.degree[v] * y[v]
+            solve_model(model, solver, 'solvepl.pl_expo')
 
-    model.solve(solver)
+    solve_model(model, solver, 'solvepl.pl_expo')
 
     #model.writeLP("model.lp")
 
     return x, y
 
 
-def pl_flot(graph, time_limit, path_to_cplex):
+def build_pl_flot(graph):
+    """
+    Construit le modèle MBVST avec du flot sur un graphe orienté, sans le résoudre.
+
+    @param graph: Le graphe orienté d'origine.
+    @return: Le modèle PuLP et les variables de décision x.
+    """
+    model = pl.LpProblem("main_problem", pl.LpMinimize)
+
+    with profiler.section('solvepl.pl_flot.build'):
+        # Sommet source
+        s = 1
+        # Nombre de sommet
+        nb_nodes = graph.number_of_nodes()
+
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
+        y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+        f = {e: pl.LpVariable(cat=pl.LpContinuous, name="f_{0}".format(e)) for e in graph.edges}
+
+        # Création de la fonction objective
+        model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
+
+        # Contrainte (9)
+        for v in range(1, nb_nodes + 1):
+            if v != s:
+                model += pl.lpSum(x[e] for e in graph.in_edges(v)) == 1
+
+        # Contrainte bonus
+        model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
+
+        # Contrainte (10)
+        model += pl.lpSum(f[e] for e in graph.out_edges(s)) - pl.lpSum(f[e] for e in graph.in_edges(s)) \
+                 == nb_nodes - 1
+
+        # Contrainte (11)
+        for v in range(1, nb_nodes + 1):
+            if v != s:
+                model += pl.lpSum(f[e] for e in graph.out_edges(v)) \
+                         - pl.lpSum(f[e] for e in graph.in_edges(v)) == -1
+
+        # Contrainte (12)
+        for e in graph.edges:
+            model += x[e] <= f[e] <= (nb_nodes - 1) * x[e]
+
+        # Contrainte (13)
+        for v in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in graph.out_edges(v)) + pl.lpSum(x[e] for e in graph.in_edges(v)) - 2 \
+                     <= graph.degree[v]*y[v]
+
+        # Contrainte (16)
+        for e in graph.edges:
+            model += f[e] >= 0
+
+    return model, x
+
+
+@profiler.profiled()
+def pl_flot(graph, time_limit, path_to_cplex, warm_start=None):
     """
     Résout le problème MBVST avec du flot sur un graphe orienté avec la méthode de PuLP et CPLEX.
 
     @param graph: Le graphe orienté d'origine.
     @param time_limit: Limite de temps pour la résolution du problème.
     @param path_to_cplex: Chemin vers CPLEX.
+    @param warm_start: Un couple (arbre, score) connu, utilisé comme solution initiale et borne (optionnel).
     @return: Les variables de décision obtenues (x, y).
     """
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=LOG_PATH, msg=False,
+                          warmStart=warm_start is not None)
+    model, x = build_pl_flot(graph)
+    if warm_start is not None:
+        set_warm_start(model, graph, x, *warm_start)
+
+    solve_model(model, solver, 'solvepl.pl_flot')
+    #model.writeLP("model.lp")
+
+    return x, pl.value(model.objective)
+
+
+def build_pl_flot_multi(graph):
+    """
+    Construit le modèle MBVST avec du multi-flot sur un graphe orienté, sans le résoudre.
+
+    @param graph: Le graphe orienté d'origine.
+    @return: Le modèle PuLP et les variables de décision x.
+    """
     model = pl.LpProblem("main_problem", pl.LpMinimize)
 
-    # Sommet source
-    s = 1
-    # Nombre de sommet
-    nb_nodes = graph.number_of_nodes()
+    with profiler.section('solvepl.pl_flot_multi.build'):
+        # Sommet source
+        s = 1
+        # Nombre de sommet
+        nb_nodes = graph.number_of_nodes()
 
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
-    y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
-    f = {e: pl.LpVariable(cat=pl.LpContinuous, name="f_{0}".format(e)) for e in graph.edges}
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
+        y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+        f = {(e, k): pl.LpVariable(cat=pl.LpContinuous, name="f_{0}_{1}".format(e,k)) for e in graph.edges for k in range(1, nb_nodes + 1)}
 
-    # Création de la fonction objective
-    model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
+        # Création de la fonction objective
+        model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
 
-    # Contrainte (9)
-    for v in range(1, nb_nodes + 1):
-        if v != s:
-            model += pl.lpSum(x[e] for e in graph.in_edges(v)) == 1
+        # Contrainte (18)
+        for v in range(1, nb_nodes+1):
+            if v != s:
+                model += pl.lpSum(x[e] for e in graph.in_edges(v)) == 1
 
-    # Contrainte bonus
-    model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
+        # Contrainte bonus
+        model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
 
-    # Contrainte (10)
-    model += pl.lpSum(f[e] for e in graph.out_edges(s)) - pl.lpSum(f[e] for e in graph.in_edges(s)) \
-             == nb_nodes - 1
+        # Contrainte (19)
+        for v in range(1, nb_nodes+1):
+            for k in range(1, nb_nodes+1):
+                if v != s and k != v:
+                    model += pl.lpSum(f[e, k] for e in graph.out_edges(v)) \
+                             - pl.lpSum(f[e, k] for e in graph.in_edges(v)) == 0
 
-    # Contrainte (11)
-    for v in range(1, nb_nodes + 1):
-        if v != s:
-            model += pl.lpSum(f[e] for e in graph.out_edges(v)) \
-                     - pl.lpSum(f[e] for e in graph.in_edges(v)) == -1
+        # Contrainte (20)
+        for k in range(1, nb_nodes + 1):
+            if k != s:
+                model += pl.lpSum(f[e, k] for e in graph.out_edges(s)) \
+                        - pl.lpSum(f[e, k] for e in graph.in_edges(s)) == 1
 
-    # Contrainte (12)
-    for e in graph.edges:
-        model += x[e] <= f[e] <= (nb_nodes - 1) * x[e]
+        # Contrainte (21)
+        for k in range(1, nb_nodes + 1):
+            if k != s:
+                model += pl.lpSum(f[e, k] for e in graph.out_edges(k)) \
+                         - pl.lpSum(f[e, k] for e in graph.in_edges(k)) == -1
 
-    # Contrainte (13)
-    for v in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in graph.out_edges(v)) + pl.lpSum(x[e] for e in graph.in_edges(v)) - 2 \
-                 <= graph.degree[v]*y[v]
+        # Contrainte (22)
+        for e in graph.edges:
+            for k in range(1, nb_nodes+1):
+                model += f[e, k] <= x[e]
 
-    # Contrainte (16)
-    for e in graph.edges:
-        model += f[e] >= 0
+        # Contrainte (23)
+        for v in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in graph.out_edges(v)) + pl.lpSum(x[e] for e in graph.in_edges(v)) - 2 \
+                     <= graph.degree[v]*y[v]
 
-    model.solve(solver)
-    #model.writeLP("model.lp")
+        # Contrainte (26)
+        for e in graph.edges:
+            for k in range(1, nb_nodes+1):
+                model += f[e, k] >= 0
 
-    return x, pl.value(model.objective)
+    return model, x
 
 
-def pl_flot_multi(graph, time_limit, path_to_cplex):
+@profiler.profiled()
+def pl_flot_multi(graph, time_limit, path_to_cplex, warm_start=None):
     """
     Résout le problème MBVST avec du multi-flot sur un graphe orienté avec la méthode de PuLP et CPLEX.
 
     @param graph: Le graphe orienté d'origine.
     @param time_limit: Limite de temps pour la résolution du problème.
     @param path_to_cplex: Chemin vers CPLEX.
+    @param warm_start: Un couple (arbre, score) connu, utilisé comme solution initiale et borne (optionnel).
     @return: Les variables de décision obtenues (x, y).
     """
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
-    model = pl.LpProblem("main_problem", pl.LpMinimize)
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=LOG_PATH, msg=False,
+                          warmStart=warm_start is not None)
+    model, x = build_pl_flot_multi(graph)
+    if warm_start is not None:
+        set_warm_start(model, graph, x, *warm_start)
 
-    # Sommet source
-    s = 1
-    # Nombre de sommet
-    nb_nodes = graph.number_of_nodes()
-
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
-    y = {v: pl.LpVariable(cat=pl.LpBinary, name="y_{0}".format(v)) for v in range(1, nb_nodes + 1)}
-    f = {(e, k): pl.LpVariable(cat=pl.LpContinuous, name="f_{0}_{1}".format(e,k)) for e in graph.edges for k in range(1, nb_nodes + 1)}
-
-    # Création de la fonction objective
-    model += pl.lpSum(y[i] for i in range(1, nb_nodes + 1))
-
-    # Contrainte (18)
-    for v in range(1, nb_nodes+1):
-        if v != s:
-            model += pl.lpSum(x[e] for e in graph.in_edges(v)) == 1
-
-    # Contrainte bonus
-    model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
-
-    # Contrainte (19)
-    for v in range(1, nb_nodes+1):
-        for k in range(1, nb_nodes+1):
-            if v != s and k != v:
-                model += pl.lpSum(f[e, k] for e in graph.out_edges(v)) \
-                         - pl.lpSum(f[e, k] for e in graph.in_edges(v)) == 0
-
-    # Contrainte (20)
-    for k in range(1, nb_nodes + 1):
-        if k != s:
-            model += pl.lpSum(f[e, k] for e in graph.out_edges(s)) \
-                    - pl.lpSum(f[e, k] for e in graph.in_edges(s)) == 1
-
-    # Contrainte (21)
-    for k in range(1, nb_nodes + 1):
-        if k != s:
-            model += pl.lpSum(f[e, k] for e in graph.out_edges(k)) \
-                     - pl.lpSum(f[e, k] for e in graph.in_edges(k)) == -1
-
-    # Contrainte (22)
-    for e in graph.edges:
-        for k in range(1, nb_nodes+1):
-            model += f[e, k] <= x[e]
-
-    # Contrainte (23)
-    for v in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in graph.out_edges(v)) + pl.lpSum(x[e] for e in graph.in_edges(v)) - 2 \
-                 <= graph.degree[v]*y[v]
-
-    # Contrainte (26)
-    for e in graph.edges:
-        for k in range(1, nb_nodes+1):
-            model += f[e, k] >= 0
-
-    model.solve(solver)
+    solve_model(model, solver, 'solvepl.pl_flot_multi')
     #model.writeLP("model.lp")
 
     return x, pl.value(model.objective)
 
 
+@profiler.profiled()
 def pl_martin(graph, time_limit, path_to_cplex):
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=LOG_PATH, msg=False)
     model = pl.LpProblem("main_problem", pl.LpMinimize)
 
-    # Nombre de sommet
-    nb_nodes = graph.number_of_nodes()
+    with profiler.section('solvepl.pl_martin.build'):
+        # Nombre de sommet
+        nb_nodes = graph.number_of_nodes()
 
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
-    y = {((e0, e1), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e0, e1), k)) for (e0,e1) in graph.edges for k in range(1, nb_nodes + 1)}
-    y.update({((e1, e0), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e1, e0), k)) for (e0,e1) in graph.edges for k in range(1, nb_nodes + 1)})
-    z = {v: pl.LpVariable(cat=pl.LpBinary, name="z_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
+        y = {((e0, e1), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e0, e1), k)) for (e0,e1) in graph.edges for k in range(1, nb_nodes + 1)}
+        y.update({((e1, e0), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e1, e0), k)) for (e0,e1) in graph.edges for k in range(1, nb_nodes + 1)})
+        z = {v: pl.LpVariable(cat=pl.LpBinary, name="z_{0}".format(v)) for v in range(1, nb_nodes + 1)}
 
-    # Création de la fonction objective
-    model += pl.lpSum(z[i] for i in range(1, nb_nodes + 1))
+        # Création de la fonction objective
+        model += pl.lpSum(z[i] for i in range(1, nb_nodes + 1))
 
-    # Contrainte (27a)
-    model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
+        # Contrainte (27a)
+        model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
 
-    # Contrainte (27b)
-    for e in graph.edges:
-        for k in range(1, nb_nodes + 1):
-            model += y[e, k] + y[(e[1], e[0]), k] == x[e]
+        # Contrainte (27b)
+        for e in graph.edges:
+            for k in range(1, nb_nodes + 1):
+                model += y[e, k] + y[(e[1], e[0]), k] == x[e]
 
-    # Contrainte (27c)
-    for e in graph.edges:
-        model += pl.lpSum(y[(e[0], k), e[1]] for k in graph.neighbors(e[0]) if k != e[1]) + x[e] == 1
+        # Contrainte (27c)
+        for e in graph.edges:
+            model += pl.lpSum(y[(e[0], k), e[1]] for k in graph.neighbors(e[0]) if k != e[1]) + x[e] == 1
         
-    for e in graph.edges:
-        model += x[e] <= y[(e[0],e[1]),e[1]]
-        model += x[e] <= y[(e[1],e[0]),e[0]]
+        for e in graph.edges:
+            model += x[e] <= y[(e[0],e[1]),e[1]]
+            model += x[e] <= y[(e[1],e[0]),e[0]]
 
-    for i in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in edges_containing_node(graph, i)) - graph.degree(i) * z[i] <= 2
+        for i in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in edges_containing_node(graph, i)) - graph.degree(i) * z[i] <= 2
 
-    model.solve(solver)
+    solve_model(model, solver, 'solvepl.pl_martin')
     #model.writeLP("model.lp")
 
     return x, pl.value(model.objective)
 
 
-def pl_martin2(graph, time_limit, path_to_cplex):
+def build_pl_martin2(graph):
     """
-        Résout le problème MBVST avec Martin (article) sur un graphe non orienté avec la méthode de PuLP et CPLEX.
-
-        @param graph: Le graphe orienté d'origine.
-        @param time_limit: Limite de temps pour la résolution du problème.
-        @param path_to_cplex: Chemin vers CPLEX.
-        @return: Les variables de décision obtenues (x, y).
-        """
+    Construit le modèle MBVST avec Martin (article) sur un graphe non orienté, sans le résoudre.
 
-    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath="info.log", msg=False)
+    @param graph: Le graphe non orienté d'origine.
+    @return: Le modèle PuLP et les variables de décision x.
+    """
     model = pl.LpProblem("main_problem", pl.LpMinimize)
 
-    # Nombre de sommet
-    nb_nodes = graph.number_of_nodes()
+    with profiler.section('solvepl.pl_martin2.build'):
+        # Nombre de sommet
+        nb_nodes = graph.number_of_nodes()
+
+        # Création des variables
+        x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
+        y = {((e0, e1), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e0, e1), k)) for (e0, e1) in graph.edges
+             for k in range(1, nb_nodes + 1)}
+        y.update(
+            {((e1, e0), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e1, e0), k)) for (e0, e1) in graph.edges
+             for k in range(1, nb_nodes + 1)})
+        z = {v: pl.LpVariable(cat=pl.LpBinary, name="z_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+
+        # Création de la fonction objective
+        model += pl.lpSum(z[i] for i in range(1, nb_nodes + 1))
 
-    # Création des variables
-    x = {e: pl.LpVariable(cat=pl.LpBinary, name="x_{0}".format(e)) for e in graph.edges}
-    y = {((e0, e1), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e0, e1), k)) for (e0, e1) in graph.edges
-         for k in range(1, nb_nodes + 1)}
-    y.update(
-        {((e1, e0), k): pl.LpVariable(cat=pl.LpBinary, name="y_{0}_{1}".format((e1, e0), k)) for (e0, e1) in graph.edges
-         for k in range(1, nb_nodes + 1)})
-    z = {v: pl.LpVariable(cat=pl.LpBinary, name="z_{0}".format(v)) for v in range(1, nb_nodes + 1)}
+        # Contrainte (27a)
+        model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
 
-    # Création de la fonction objective
-    model += pl.lpSum(z[i] for i in range(1, nb_nodes + 1))
+        # Contrainte (27b)
+        for e in graph.edges:
+            for k in range(1, nb_nodes + 1):
+                model += y[e, k] + y[(e[1], e[0]), k] == x[e]
+
+        # Contrainte (27c)
+        for k in range(1, nb_nodes + 1):
+            model += pl.lpSum(y[(k, u), k] for u in range(1, nb_nodes + 1) if (k,u) in graph.edges) <= 0
 
-    # Contrainte (27a)
-    model += pl.lpSum(x[e] for e in graph.edges) == nb_nodes - 1
 
-    # Contrainte (27b)
-    for e in graph.edges:
         for k in range(1, nb_nodes + 1):
-            model += y[e, k] + y[(e[1], e[0]), k] == x[e]
+            for u in range(1, nb_nodes + 1):
+                if k != u:
+                    model += pl.lpSum(y[(u, v), k] for v in range(1, nb_nodes + 1) if (u,v) in graph.edges) <= 1
 
-    # Contrainte (27c)
-    for k in range(1, nb_nodes + 1):
-        model += pl.lpSum(y[(k, u), k] for u in range(1, nb_nodes + 1) if (k,u) in graph.edges) <= 0
+        for i in range(1, nb_nodes + 1):
+            model += pl.lpSum(x[e] for e in edges_containing_node(graph, i)) - graph.degree(i) * z[i] <= 2
 
+    return model, x
 
-    for k in range(1, nb_nodes + 1):
-        for u in range(1, nb_nodes + 1):
-            if k != u:
-                model += pl.lpSum(y[(u, v), k] for v in range(1, nb_nodes + 1) if (u,v) in graph.edges) <= 1
 
-    for i in range(1, nb_nodes + 1):
-        model += pl.lpSum(x[e] for e in edges_containing_node(graph, i)) - graph.degree(i) * z[i] <= 2
+@profiler.profiled()
+def pl_martin2(graph, time_limit, path_to_cplex, warm_start=None):
+    """
+        Résout le problème MBVST avec Martin (article) sur un graphe non orienté avec la méthode de PuLP et CPLEX.
+
+        @param graph: Le graphe orienté d'origine.
+        @param time_limit: Limite de temps pour la résolution du problème.
+        @param path_to_cplex: Chemin vers CPLEX.
+        @param warm_start: Un couple (arbre, score) connu, utilisé comme solution initiale et borne (optionnel).
+        @return: Les variables de décision obtenues (x, y).
+        """
+
+    solver = pl.CPLEX_CMD(path=path_to_cplex, timeLimit=time_limit, logPath=LOG_PATH, msg=False,
+                          warmStart=warm_start is not None)
+    model, x = build_pl_martin2(graph)
+    if warm_start is not None:
+        set_warm_start(model, graph, x, *warm_start)
 
-    model.solve(solver)
+    solve_model(model, solver, 'solvepl.pl_martin2')
     #model.writeLP("model.lp")
 
     return x, pl.value(model.objective)